@@ -0,0 +1,341 @@
+"""
+Headless HTTP API for the caregiver chatbot.
+
+All requests share the process-wide model registry, so the models are loaded once no
+matter how many requests or workers there are, when the app is created. Model work,
+building the chatbot included, runs on a bounded thread pool; when every worker is busy
+and the wait queue is full, requests are rejected with 429 instead of piling up. Metrics
+for Prometheus are served at /metrics.
+
+Routes holding a user's data need the token POST /users issued for that user, sent as
+"Authorization: Bearer <token>" (see identity.py).
+
+Run locally with Flask's threaded server:
+    python api.py --port 8000 --workers 4 --queue-size 32
+or behind a production WSGI server, one process per replica:
+    gunicorn --threads 8 "api:create_app()"
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import Flask, Response, g, jsonify, request
+
+from caregiver_chatbot import CaregiverChatbot, detect_language
+from identity import new_user, verify_token
+from inference_engines import ENGINES, INFERENCE_ENGINE
+from intent_classifier import get_intent_classifier
+from model_registry import get_model_registry
+from resource_index import get_resource_index
+from task_store import get_task_store
+from telemetry import PROMETHEUS_CONTENT_TYPE, get_telemetry
+
+DEFAULT_WORKERS = int(os.environ.get("CAREGIVER_API_WORKERS", "4"))
+DEFAULT_QUEUE_SIZE = int(os.environ.get("CAREGIVER_API_QUEUE_SIZE", "32"))
+MAX_BATCH_MESSAGES = 256
+MAX_RESOURCE_PAGE = 100
+TONES = ("soft", "directive")
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class WorkerPool:
+    """
+    Thread pool with a bounded backlog: at most `workers` jobs run at once and at most
+    `queue_size` more wait for a worker. Further submissions are refused immediately.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def run(self, func, *args):
+        """
+        Run `func(*args)` on a worker and wait for its result.
+        :raises ApiError: With status 429 when the pool and its queue are full
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ApiError("Server is busy, please retry shortly", status=429)
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+
+def _json_body():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise ApiError("Request body must be a JSON object")
+    return body
+
+
+def _text_field(body, name):
+    value = body.get(name)
+    if not isinstance(value, str) or not value.strip():
+        raise ApiError(f"'{name}' must be a non-empty string")
+    return value
+
+
+def _authenticated_user(user_id=None):
+    """
+    Return the id of the user whose token the request carries.
+    :param user_id: User the request names, whose token it must carry
+    :raises ApiError: With status 401 without a valid token, 403 with another user's token
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    authenticated = verify_token(token.strip()) if scheme.lower() == "bearer" else None
+    if authenticated is None:
+        raise ApiError("A valid bearer token is required", status=401)
+    if user_id is not None and user_id != authenticated:
+        raise ApiError("The token does not belong to this user", status=403)
+    return authenticated
+
+
+def _local_datetime(value):
+    """
+    Parse an ISO 8601 date and time. Values with a UTC offset are converted to naive local
+    time, the form every due time is stored in, so they compare and sort with the others.
+    :raises ValueError: If the value is not an ISO 8601 date and time
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _task_fields(body, partial=False):
+    """
+    Validate task fields. The due time is given either as "due_at" (ISO 8601) or as
+    "date" ("YYYY-MM-DD") plus "time" ("HH:MM").
+    """
+    fields = {}
+    for name in ("type", "name"):
+        if name in body:
+            fields[name] = _text_field(body, name)
+        elif not partial:
+            raise ApiError(f"Missing task field: {name}")
+
+    try:
+        if "due_at" in body:
+            fields["due_at"] = _local_datetime(body["due_at"])
+        elif "date" in body and "time" in body:
+            fields["due_at"] = datetime.strptime(f"{body['date']} {body['time']}", "%Y-%m-%d %H:%M")
+        elif not partial:
+            raise ApiError("Missing task due time: give 'due_at' or 'date' and 'time'")
+    except (TypeError, ValueError):
+        raise ApiError("Invalid task due time")
+
+    if "repeat_minutes" in body:
+        repeat = body["repeat_minutes"]
+        if repeat is not None and (not isinstance(repeat, int) or isinstance(repeat, bool) or repeat <= 0):
+            raise ApiError("'repeat_minutes' must be a positive integer or null")
+        fields["repeat_minutes"] = repeat
+    return fields
+
+
+def create_app(workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, device=-1, task_store=None,
+               engine=INFERENCE_ENGINE, warm_up=True, warm_up_generation=False):
+    """
+    Build the Flask application.
+    :param workers: Number of threads running model work
+    :param queue_size: Number of requests allowed to wait for a worker before answering 429
+    :param device: Device index for the models (-1 for CPU)
+    :param task_store: Store for care tasks; defaults to the process-wide SQLite store
+    :param engine: Inference engine for the models: "torch", "int8" or "onnx"
+    :param warm_up: Load the models and the intent examples before returning, so the first
+                    requests do not wait for them
+    :param warm_up_generation: Also load the language model before returning; otherwise the
+                               first generative request loads it
+    """
+    app = Flask(__name__)
+    pool = WorkerPool(workers, queue_size)
+    registry = get_model_registry(device, engine)
+    if warm_up:
+        registry.warm_up(background=False, generation=warm_up_generation)
+        get_intent_classifier(registry).warm_up()
+    tasks = task_store or get_task_store()
+    telemetry = get_telemetry()
+    app.config.update(WORKER_POOL=pool, TASK_STORE=tasks)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_duration(response):
+        # Labelled by route rule rather than path, so per-user URLs share one series
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        telemetry.observe("caregiver_api_request_seconds", time.perf_counter() - g.request_started,
+                          endpoint=endpoint, method=request.method)
+        return response
+
+    def chatbot(tone="soft", language="en", generative=False, user_id=None):
+        # Called on a pool worker: building the chatbot may wait for a model to load
+        return CaregiverChatbot(language=language, device=device, tone=tone, registry=registry,
+                                generative=generative, task_store=tasks, user_id=user_id)
+
+    @app.errorhandler(ApiError)
+    def handle_api_error(error):
+        response = jsonify(error=str(error))
+        response.status_code = error.status
+        if error.status == 429:
+            response.headers["Retry-After"] = "1"
+        elif error.status == 401:
+            response.headers["WWW-Authenticate"] = "Bearer"
+        return response
+
+    @app.get("/health")
+    def health():
+        return jsonify(status="ok", models={
+            "/".join(map(str, key)): stats for key, stats in registry.stats().items()
+        })
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(telemetry.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.post("/message")
+    def message():
+        body = _json_body()
+        text = _text_field(body, "message")
+        tone = body.get("tone", "soft")
+        if tone not in TONES:
+            raise ApiError(f"'tone' must be one of: {', '.join(TONES)}")
+        # Task questions are answered from the user's tasks only with that user's token
+        user_id = _authenticated_user(body["user_id"]) if "user_id" in body else None
+
+        def reply():
+            bot = chatbot(tone, body.get("language", "en"), bool(body.get("generative", False)), user_id)
+            response = bot.process_message(text)
+            intent = bot.last_intent
+            telemetry.increment("caregiver_intents_total", intent=intent.name if intent else "none")
+            return {
+                "reply": response,
+                "intent": intent.name if intent else None,
+                "generation": bot.last_generation_stats,
+                "resources": [
+                    {field: resource.get(field) for field in ("title", "link", "type")}
+                    for resource in bot.suggest_resources(text)
+                ],
+            }
+
+        return jsonify(pool.run(reply))
+
+    @app.post("/sentiment")
+    def sentiment():
+        text = _text_field(_json_body(), "message")
+        return jsonify(pool.run(lambda: chatbot().analyze_sentiment(text)))
+
+    @app.post("/sentiment/batch")
+    def sentiment_batch():
+        messages = _json_body().get("messages")
+        if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+            raise ApiError("'messages' must be a list of strings")
+        if len(messages) > MAX_BATCH_MESSAGES:
+            raise ApiError(f"At most {MAX_BATCH_MESSAGES} messages per batch", status=413)
+        return jsonify(results=pool.run(lambda: chatbot().analyze_sentiments(messages)))
+
+    @app.post("/language")
+    def language():
+        text = _text_field(_json_body(), "text")
+        return jsonify(language=pool.run(detect_language, text))
+
+    @app.get("/resources")
+    def search_resources():
+        k = request.args.get("k", 10, type=int)
+        offset = request.args.get("offset", 0, type=int)
+        if not 0 < k <= MAX_RESOURCE_PAGE or offset < 0:
+            raise ApiError(f"'k' must be between 1 and {MAX_RESOURCE_PAGE} and 'offset' non-negative")
+        results, total = get_resource_index().search(
+            request.args.get("q", ""), k=k, offset=offset,
+            language=request.args.get("language"), resource_type=request.args.get("type"),
+        )
+        return jsonify(resources=results, total=total)
+
+    @app.post("/users")
+    def create_user():
+        user_id, token = new_user()
+        return jsonify(user_id=user_id, token=token), 201
+
+    @app.get("/users/<user_id>/tasks")
+    def list_tasks(user_id):
+        _authenticated_user(user_id)
+        view = request.args.get("view", "all")
+        limit = request.args.get("limit", 100, type=int)
+        if view == "next":
+            return jsonify(tasks=tasks.next_due(user_id, n=limit))
+        if view == "overdue":
+            return jsonify(tasks=tasks.overdue(user_id, limit=limit))
+        if view == "window":
+            try:
+                start = _local_datetime(request.args["start"])
+                end = _local_datetime(request.args["end"])
+            except (KeyError, ValueError):
+                raise ApiError("view=window needs ISO 'start' and 'end' parameters")
+            return jsonify(tasks=tasks.due_between(user_id, start, end, limit=limit))
+        return jsonify(tasks=tasks.list_tasks(user_id, limit=limit, offset=request.args.get("offset", 0, type=int)))
+
+    @app.post("/users/<user_id>/tasks")
+    def add_task(user_id):
+        _authenticated_user(user_id)
+        fields = _task_fields(_json_body())
+        task = tasks.add_task(user_id, fields["type"], fields["name"], fields["due_at"], fields.get("repeat_minutes"))
+        return jsonify(task), 201
+
+    @app.get("/users/<user_id>/tasks/<int:task_id>")
+    def get_task(user_id, task_id):
+        _authenticated_user(user_id)
+        task = tasks.get_task(user_id, task_id)
+        if task is None:
+            raise ApiError("Task not found", status=404)
+        return jsonify(task)
+
+    @app.put("/users/<user_id>/tasks/<int:task_id>")
+    def update_task(user_id, task_id):
+        _authenticated_user(user_id)
+        task = tasks.update_task(user_id, task_id, **_task_fields(_json_body(), partial=True))
+        if task is None:
+            raise ApiError("Task not found", status=404)
+        return jsonify(task)
+
+    @app.delete("/users/<user_id>/tasks/<int:task_id>")
+    def delete_task(user_id, task_id):
+        _authenticated_user(user_id)
+        if not tasks.delete_task(user_id, task_id):
+            raise ApiError("Task not found", status=404)
+        return "", 204
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the caregiver chatbot HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--engine", choices=ENGINES, default=INFERENCE_ENGINE, help="inference engine for the models")
+    parser.add_argument("--no-warm-up", action="store_true", help="load models on first request instead of at start")
+    parser.add_argument("--warm-up-generation", action="store_true",
+                        help="also load the language model at start, for clients asking for generated replies")
+    args = parser.parse_args()
+
+    app = create_app(workers=args.workers, queue_size=args.queue_size, engine=args.engine,
+                     warm_up=not args.no_warm_up, warm_up_generation=args.warm_up_generation)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import streamlit as st
-import base64
 import os
 import streamlit.components.v1 as components
 import random
@@ -8,6 +7,22 @@ import time
 # ------------------ PAGE CONFIG -------------------
 # This must be the very first Streamlit command
 st.set_page_config(page_title="Caregiver AI Support", page_icon="🤖")
+script_started = time.perf_counter()
+
+# The page is split into fragments: an interaction inside one reruns only that section.
+# Widgets outside any fragment (language, tone, ...) still rerun the whole script.
+from section_timing import get_section_timer, timed_fragment
+from telemetry import PROMETHEUS_CONTENT_TYPE, get_telemetry
+
+telemetry = get_telemetry()
+
+# ------------------ SHARED MODELS -------------------
+# Models are loaded once per process and shared by every session. Nothing heavy (torch,
+# transformers, the models) is imported here: the warm-up starts once the first page has
+# been sent, and the conversation says it is warming up until it has finished.
+from startup import get_warm_up
+
+warm_up = get_warm_up()
 
 # ------------------ MAGIC BACKGROUND -------------------
 def inject_custom_background():
@@ -68,181 +83,319 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# 🎶 Load and encode audio
-def get_base64_audio(file_path):
-    with open(file_path, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
-
-audio_base64 = get_base64_audio("magical.mp4")
-
-# 🎚 Session toggle
-if "play_music" not in st.session_state:
-    st.session_state.play_music = False
-
-col1, col2 = st.columns([1, 1])
-with col1:
-    if st.button("🔈 Play Music"):
-        st.session_state.play_music = True
-with col2:
-    if st.button("🔇 Stop Music"):
-        st.session_state.play_music = False
-
-# 🔊 Embed music and animated visualizer if playing
-if st.session_state.play_music:
-    st.markdown(f"""
-    <audio id="bgmusic" autoplay loop>
-        <source src="data:audio/mp4;base64,{audio_base64}" type="audio/mp4">
-    </audio>
-    <div class="audio-button">
-        <div class="bar"></div>
-        <div class="bar"></div>
-        <div class="bar"></div>
-        <div class="bar"></div>
-        <div class="bar"></div>
-    </div>
-    """, unsafe_allow_html=True)
+# 🎶 The audio file is served by the local asset server (cacheable, seekable) rather than
+# inlined into the page, and is only looked up once playback is requested
+from asset_server import get_asset_server
+
+# ------------------ SHARED SESSION STATE -------------------
+# Everything the sections share lives here; each section reads and writes only these keys.
+from mood import get_mood_df
+from session_store import get_streamlit_session, sync_session_on_fragment_run
+from identity import get_streamlit_user_id
+
+# Care tasks and the session are stored per user. The user id is issued by the server and
+# kept in a signed cookie, so a reload or another app replica finds them again, while a
+# shared link or a guessed id opens nobody else's history
+st.session_state.user_id = get_streamlit_user_id()
+if "user" in st.query_params:
+    del st.query_params["user"]  # Links from when the id was kept in the URL
+# Chat history, mood history, points, badges and music live in the session store: each key
+# is read on first use in a rerun, and changes are written once at the end of it
+session = get_streamlit_session(st.session_state.user_id)
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 1
+
+@st.cache_resource(show_spinner=False)
+def background_music():
+    """
+    The background music's bytes, read once per process for every session that cannot
+    reach the asset server, or None if the file is missing.
+    """
+    music_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "magical.mp4")
+    if not os.path.isfile(music_path):
+        return None
+    with open(music_path, "rb") as f:
+        return f.read()
+
+def asset_server_reachable():
+    """
+    Whether this browser can follow asset server links; otherwise the music and downloads go
+    through Streamlit's own elements, served from the app's port.
+    """
+    return get_asset_server().reachable_from(st.context.headers.get("Host"))
+
+@timed_fragment("music")
+@sync_session_on_fragment_run
+def music_section():
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        if st.button("🔈 Play Music"):
+            session["play_music"] = True
+    with col2:
+        if st.button("🔇 Stop Music"):
+            session["play_music"] = False
+
+    # 🔊 Embed music and animated visualizer if playing
+    play_music = session.get("play_music", False)
+    audio_url = None
+    if play_music and asset_server_reachable():
+        audio_url = get_asset_server().url_for("magical.mp4")
+    if play_music and audio_url is None:
+        # Sent through Streamlit instead: works from any browser, from bytes read only once
+        music = background_music()
+        if music is not None:
+            st.audio(music, format="audio/mp4", loop=True, autoplay=True)
+        else:
+            st.warning("Background music is unavailable right now.")
+    elif play_music:
+        st.markdown(f"""
+        <audio id="bgmusic" autoplay loop>
+            <source src="{audio_url}" type="audio/mp4">
+        </audio>
+        <div class="audio-button">
+            <div class="bar"></div>
+            <div class="bar"></div>
+            <div class="bar"></div>
+            <div class="bar"></div>
+            <div class="bar"></div>
+        </div>
+        """, unsafe_allow_html=True)
+
+music_section()
 
 # ------------------ HEADER AND CONTENT -------------------
-from PIL import Image
-from caregiver_chatbot import CaregiverChatbot
-import pandas as pd
+from caregiver_chatbot import CaregiverChatbot, detect_language
+from language import LANGUAGE_CODES
+from task_store import get_reminder_scheduler, get_task_store, pop_due_reminders
+from contextlib import nullcontext
 from datetime import datetime
-import base64
-from langdetect import detect
-import torch  # Import torch to check if GPU is available
 
-try:
-    logo = Image.open("Logo.jpg")
-except FileNotFoundError:
-    st.error("Logo image not found. Please ensure 'Logo.jpg' is in the same directory.")
-    logo = None
+# The logo is served by Streamlit itself from static/ (see .streamlit/config.toml) and cached
+# by the browser, so it is never read or decoded here (st.image would import PIL)
+logo_found = os.path.isfile(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "Logo.jpg"))
+if not logo_found:
+    st.error("Logo image not found. Please ensure 'Logo.jpg' is in the static directory.")
 
 col1, col2 = st.columns([1, 5])
 with col1:
-    if logo:
-        st.image(logo, width=100)
+    if logo_found:
+        st.markdown('<img src="app/static/Logo.jpg" width="100" alt="Logo">', unsafe_allow_html=True)
 with col2:
     st.markdown("## 🤖 Digital Care Companion 🤖")
     st.markdown("**Empowering caregivers of children with medical complexity through AI.**")
 
-language_choice = st.selectbox(
-    "Choose your language:",
-    ["English", "Mandarin Chinese", "Hindi", "Spanish", "French", "Standard Arabic", "Bengali", "Portuguese", "Russian", "Urdu"]
-)
+language_choice = st.selectbox("Choose your language:", list(LANGUAGE_CODES))
 
 tone_choice = st.selectbox("Select chatbot tone:", ["Soft", "Directive"])
 
-device = 0 if torch.cuda.is_available() else -1
-
-chatbot = CaregiverChatbot(language=language_choice.lower(), device=device, tone=tone_choice.lower())
-
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
-
-user_input = st.text_input("You:", "")
-
-def detect_language(text):
-    try:
-        return detect(text)
-    except:
-        return "en"
-
-if st.button("Send"):
-    if user_input:
-        detected_language = detect_language(user_input)
-        chatbot.set_language(detected_language)
-        response = chatbot.process_message(user_input)
-        st.session_state.chat_history.append(("You", user_input, datetime.now()))
-        st.session_state.chat_history.append(("Bot", response, datetime.now()))
-
-st.markdown("#### Or select a quick support topic:")
-
-if st.button("💖 Emotional support"):
-    response = chatbot.process_message("I feel overwhelmed")
-    st.session_state.chat_history.append(("You", "I feel overwhelmed", datetime.now()))
-    st.session_state.chat_history.append(("Bot", response, datetime.now()))
-
-if st.button("💊 Medication help"):
-    response = chatbot.process_message("I need help with medication")
-    st.session_state.chat_history.append(("You", "I need help with medication", datetime.now()))
-    st.session_state.chat_history.append(("Bot", response, datetime.now()))
-
-if st.button("📅 Appointment reminder"):
-    response = chatbot.process_message("Help me manage appointments")
-    st.session_state.chat_history.append(("You", "Help me manage appointments", datetime.now()))
-    st.session_state.chat_history.append(("Bot", response, datetime.now()))
-
-def get_mood_df(chat_history):
-    moods = []
-    scores = []
-    for entry in chat_history:
-        sentiment_result = chatbot.analyze_sentiment(entry[1])
-        moods.append(sentiment_result['label'])
-        scores.append(sentiment_result['score'])
-    df = pd.DataFrame({"Mood": moods, "Score": scores})
-    return df
-
-if st.sidebar.checkbox("📈 Show Mood Evolution Dashboard"):
-    df = get_mood_df(st.session_state.chat_history)
-    if not df.empty:
-        st.subheader("Caregiver Mood Evolution Over Time")
-        if 'Time' in df.columns:
-            df = df.rename(columns={"Time": "index"})
-            st.line_chart(df.set_index("index"))
-        else:
-            st.line_chart(df)
-        st.caption("This chart shows how the caregiver's emotional tone has changed over time based on their messages.")
-    else:
-        st.write("No conversation history to show mood evolution.")
-
-st.sidebar.markdown("## 📋 Care Tasks Tracker")
-
-if "tasks" not in st.session_state:
-    st.session_state.tasks = []
-
-task_type = st.sidebar.selectbox("Task Type", ["Medication", "Doctor Appointment", "Feeding", "Nap", "Other"])
-task_name = st.sidebar.text_input("Task Description")
-task_date = st.sidebar.date_input("Select Date")
-task_time = st.sidebar.time_input("Select Time")
-
-if st.sidebar.button("➕ Add Task"):
-    if task_name:
-        task = {
-            "type": task_type,
-            "name": task_name,
-            "date": task_date.strftime("%Y-%m-%d"),
-            "time": task_time.strftime("%H:%M")
-        }
-        st.session_state.tasks.append(task)
-        st.sidebar.success("✅ Task added successfully!")
-    else:
-        st.sidebar.warning("Please enter a task description.")
+generative_choice = st.checkbox(
+    "✨ Generated replies (beta)",
+    help="Reply to messages the chatbot has no prepared answer for with text generated by the language model.",
+)
 
-if st.sidebar.button("⬇️ Export Chat History"):
-    if st.session_state.chat_history:
-        df_chat = pd.DataFrame(
-            [(speaker, message, timestamp.strftime("%Y-%m-%d %H:%M:%S")) for speaker, message, timestamp in st.session_state.chat_history],
-            columns=["Speaker", "Message", "Timestamp"]
+task_store = get_task_store()
+reminder_scheduler = get_reminder_scheduler()
+reminder_scheduler.watch(st.session_state.user_id)
+
+# Seconds rather than "30s": Streamlit parses duration strings with pandas
+@timed_fragment("reminders", run_every=30)
+def show_due_reminders():
+    # Keeps the user watched while the page is open, even when nothing is clicked
+    reminder_scheduler.watch(st.session_state.user_id)
+    for task in pop_due_reminders(st.session_state.user_id):
+        st.toast(f"⏰ Time for **{task['type']}**: {task['name']} ({task['time']})")
+
+show_due_reminders()
+
+HISTORY_PAGE_SIZE = 20
+
+def count_intent(chatbot):
+    intent = chatbot.last_intent
+    telemetry.increment("caregiver_intents_total", intent=intent.name if intent else "none")
+
+def answer_quick_topic(chatbot, chat_log, message):
+    with telemetry.span("process_message"):
+        response = chatbot.process_message(message)
+    count_intent(chatbot)
+    chat_log.append("You", message)
+    chat_log.append("Bot", response)
+    show_resource_suggestions(chatbot, message)
+
+def show_resource_suggestions(chatbot, message):
+    with telemetry.span("resource_suggestions"):
+        suggestions = chatbot.suggest_resources(message)
+    if suggestions:
+        st.markdown("📚 **You might find these helpful:**\n" + "\n".join(
+            f"- [{resource['title']}]({resource['link']}) ({resource['type']})" for resource in suggestions
+        ))
+
+@st.fragment(run_every=1)
+def warming_up_notice():
+    if warm_up.is_ready():
+        st.rerun()
+    st.info(f"⏳ Warming up the assistant: {warm_up.step.lower()}...")
+
+@timed_fragment("conversation")
+@sync_session_on_fragment_run
+def conversation_section(language, tone, generative, show_mood_dashboard):
+    """
+    Chat input, quick topics, mood dashboard and chat history: the only section that
+    builds the chatbot and calls the models.
+    """
+    if not warm_up.is_ready():
+        warming_up_notice()
+        return
+    # The language model is not part of the warm-up: the first generative chatbot loads it
+    loading = st.spinner("Loading the language model...") if generative else nullcontext()
+    with telemetry.span("chatbot_init"), loading:
+        chatbot = CaregiverChatbot(
+            language=language, device=warm_up.device, tone=tone, generative=generative,
+            registry=warm_up.registry, task_store=task_store, user_id=st.session_state.user_id,
         )
-        csv = df_chat.to_csv(index=False).encode('utf-8')
-        b64 = base64.b64encode(csv).decode()
-        href = f'<a href="data:file/csv;base64,{b64}" download="chat_history.csv">📥 Download CSV</a>'
-        st.sidebar.markdown(href, unsafe_allow_html=True)
-    else:
-        st.sidebar.warning("No chat history available to export.")
-
-for speaker, message, *_ in st.session_state.chat_history:
-    st.markdown(f"**{speaker}:** {message}")
-
-if st.checkbox("📋 Show Care Tasks"):
-    st.subheader("Scheduled Care Tasks")
-    if st.session_state.tasks:
-        for i, task in enumerate(st.session_state.tasks):
-            st.markdown(f"**{task['type']}** — {task['name']} at {task['time']} on {task['date']}")
+    chat_log = session.chat_log()
+
+    user_input = st.text_input("You:", "")
+
+    if st.button("Send"):
+        if user_input:
+            # Messages too short or plain to tell apart keep the language chosen above
+            with telemetry.span("detect_language"):
+                detected_language = detect_language(user_input, default=chatbot.language)
+            chatbot.set_language(detected_language)
+            # Show the reply as it streams in; it is rendered again with the chat history below
+            stream_area = st.empty()
+            with stream_area, telemetry.span("reply"):
+                response = st.write_stream(chatbot.stream_reply(user_input)).strip()
+            stream_area.empty()
+            count_intent(chatbot)
+            if chatbot.last_generation_stats:
+                stats = chatbot.last_generation_stats
+                st.caption(
+                    f"⏱ First words after {stats['ttft_seconds'] * 1000:.0f} ms, "
+                    f"{stats['tokens_per_second']:.1f} tokens/s"
+                )
+            chat_log.append("You", user_input)
+            chat_log.append("Bot", response)
+            show_resource_suggestions(chatbot, user_input)
+
+    st.markdown("#### Or select a quick support topic:")
+
+    if st.button("💖 Emotional support"):
+        answer_quick_topic(chatbot, chat_log, "I feel overwhelmed")
+
+    if st.button("💊 Medication help"):
+        answer_quick_topic(chatbot, chat_log, "I need help with medication")
+
+    if st.button("📅 Appointment reminder"):
+        answer_quick_topic(chatbot, chat_log, "Help me manage appointments")
+
+    if show_mood_dashboard:
+        with telemetry.span("mood_dashboard"):
+            df = get_mood_df(chatbot, chat_log, session.stored_list("mood_history"))
+        if not df.empty:
+            st.subheader("Caregiver Mood Evolution Over Time")
+            st.line_chart(df["Score"])
+            st.caption("This chart shows how the caregiver's emotional tone has changed over time based on their messages.")
+        else:
+            st.write("No conversation history to show mood evolution.")
+
+    shown_messages = HISTORY_PAGE_SIZE * st.session_state.history_pages
+    if len(chat_log) > shown_messages and st.button("⬆️ Load older messages"):
+        st.session_state.history_pages += 1
+        shown_messages += HISTORY_PAGE_SIZE
+    with telemetry.span("chat_history"):
+        for speaker, message, *_ in chat_log.tail(shown_messages):
+            st.markdown(f"**{speaker}:** {message}")
+
+show_mood_dashboard = st.sidebar.checkbox("📈 Show Mood Evolution Dashboard")
+conversation_section(LANGUAGE_CODES[language_choice], tone_choice.lower(), generative_choice, show_mood_dashboard)
+
+REPEAT_OPTIONS = {"Never": None, "Every 4 hours": 4 * 60, "Every 8 hours": 8 * 60, "Daily": 24 * 60, "Weekly": 7 * 24 * 60}
+
+@timed_fragment("task tracker")
+def task_tracker_section():
+    st.markdown("## 📋 Care Tasks Tracker")
+    task_type = st.selectbox("Task Type", ["Medication", "Doctor Appointment", "Feeding", "Nap", "Other"])
+    task_name = st.text_input("Task Description")
+    task_date = st.date_input("Select Date")
+    task_time = st.time_input("Select Time")
+    task_repeat = st.selectbox("Repeat", list(REPEAT_OPTIONS))
+
+    if st.button("➕ Add Task"):
+        if task_name:
+            task = task_store.add_task(
+                st.session_state.user_id,
+                task_type,
+                task_name,
+                datetime.combine(task_date, task_time),
+                repeat_minutes=REPEAT_OPTIONS[task_repeat],
+            )
+            reminder_scheduler.schedule(task)
+            st.success("✅ Task added successfully!")
+        else:
+            st.warning("Please enter a task description.")
+
+with st.sidebar:
+    task_tracker_section()
+
+with st.sidebar.expander("🧠 Model status"):
+    model_stats = warm_up.registry.stats() if warm_up.registry else {}
+    if model_stats:
+        for (kind, name, _, engine), stat in model_stats.items():
+            st.markdown(
+                f"**{kind}** `{name}` ({engine}) — loaded in {stat['load_seconds']:.1f}s, "
+                f"{stat['rss_bytes'] / 2**20:.0f} MB resident"
+            )
     else:
-        st.info("No tasks scheduled yet. Use the sidebar to add care activities.")
-
+        st.write("Models are still warming up...")
+
+@timed_fragment("export")
+@sync_session_on_fragment_run
+def export_section():
+    if st.button("⬇️ Export Chat History"):
+        chat_log = session.chat_log()
+        if len(chat_log):
+            # The CSV is streamed from the session store when the link is followed, never built
+            # in memory here
+            export_url = None
+            if asset_server_reachable():
+                export_url = get_asset_server().download_url("chat_history.csv", chat_log.iter_csv,
+                                                             "text/csv; charset=utf-8")
+            if export_url:
+                st.markdown(f"[📥 Download CSV]({export_url})")
+            else:
+                # st.download_button cannot stream: the whole CSV is built in memory, though
+                # only once the button is clicked
+                st.download_button(
+                    "📥 Download CSV", lambda: b"".join(chat_log.iter_csv()), "chat_history.csv", "text/csv"
+                )
+        else:
+            st.warning("No chat history available to export.")
+
+with st.sidebar:
+    export_section()
+
+@timed_fragment("care tasks")
+def care_tasks_section():
+    # Tasks added in the sidebar show up here on this section's next rerun
+    if st.checkbox("📋 Show Care Tasks"):
+        st.subheader("Scheduled Care Tasks")
+        overdue_tasks = task_store.overdue(st.session_state.user_id, limit=20)
+        upcoming_tasks = task_store.next_due(st.session_state.user_id, n=20)
+        if overdue_tasks:
+            st.markdown("##### ⏰ Overdue")
+            for task in overdue_tasks:
+                st.markdown(f"**{task['type']}** — {task['name']} at {task['time']} on {task['date']}")
+        if upcoming_tasks:
+            st.markdown("##### 🗓️ Coming up")
+            for task in upcoming_tasks:
+                repeat = " 🔁" if task["repeat_minutes"] else ""
+                st.markdown(f"**{task['type']}** — {task['name']} at {task['time']} on {task['date']}{repeat}")
+        if not overdue_tasks and not upcoming_tasks:
+            st.info("No tasks scheduled yet. Use the sidebar to add care activities.")
+        st.button("🔄 Refresh tasks")  # Reruns just this section, reading the tasks again
+
+care_tasks_section()
 
 
 
@@ -260,47 +413,104 @@ affirmations = [
     "Take a deep breath and smile, you're doing amazing!",
 ]
 
+# 4-7-8 breathing exercise, timed and animated client-side
+BREATHING_EXERCISE_HTML = """
+<style>
+  .breathing { font-family: sans-serif; text-align: center; color: #4a148c; }
+  .breathing button {
+    margin: 8px 4px; padding: 8px 16px; border: 1px solid #7e57c2; border-radius: 8px;
+    background: white; color: #4a148c; cursor: pointer; font-size: 15px;
+  }
+  .circle {
+    width: 80px; height: 80px; margin: 16px auto; border-radius: 50%;
+    background: radial-gradient(circle, #b39ddb, #7e57c2);
+    transform: scale(0.6); transition-property: transform; transition-timing-function: ease-in-out;
+  }
+  .phase { font-size: 20px; min-height: 28px; }
+  .count { font-size: 15px; color: #6a5acd; min-height: 20px; }
+</style>
+<div class="breathing">
+  <button id="start">🌬️ Start breathing (4-7-8)</button>
+  <button id="stop">⏹ Stop</button>
+  <div class="circle" id="circle"></div>
+  <div class="phase" id="phase">Press start when you are ready.</div>
+  <div class="count" id="count"></div>
+</div>
+<script>
+  const phases = [
+    {label: "Inhale for 4 seconds...", seconds: 4, scale: 1.4},
+    {label: "Hold your breath...", seconds: 7, scale: 1.4},
+    {label: "Exhale slowly...", seconds: 8, scale: 0.6},
+  ];
+  const circle = document.getElementById("circle");
+  const phase = document.getElementById("phase");
+  const count = document.getElementById("count");
+  let timer = null;
+
+  function stop(message) {
+    clearInterval(timer);
+    timer = null;
+    count.textContent = "";
+    phase.textContent = message;
+  }
+
+  function run(index, cycle) {
+    if (index === phases.length) {
+      if (cycle === 3) { stop("Repeat this a few times to calm your mind."); return; }
+      run(0, cycle + 1);
+      return;
+    }
+    const current = phases[index];
+    let remaining = current.seconds;
+    phase.textContent = current.label;
+    count.textContent = remaining;
+    circle.style.transitionDuration = current.seconds + "s";
+    circle.style.transform = "scale(" + current.scale + ")";
+    clearInterval(timer);
+    timer = setInterval(() => {
+      remaining -= 1;
+      if (remaining > 0) { count.textContent = remaining; return; }
+      run(index + 1, cycle);
+    }, 1000);
+  }
+
+  document.getElementById("start").onclick = () => run(0, 1);
+  document.getElementById("stop").onclick = () => {
+    circle.style.transitionDuration = "1s";
+    circle.style.transform = "scale(0.6)";
+    stop("Press start when you are ready.");
+  };
+</script>
+"""
+
 # Streamlit UI
 st.title("Caregiver Emotional Support Games")
 
-# Options for games/activities
-activity = st.selectbox("Choose an activity", ("Journaling", "Breathing Exercise", "Positive Affirmation"))
-
-if activity == "Journaling":
-    st.subheader("Journaling Activity")
-    journal_entry = st.text_area("Write your thoughts here...", height=200)
-    if journal_entry:
-        st.write("Your thoughts today:")
-        st.write(journal_entry)
-    else:
-        st.write("Take your time to reflect and write...")
-
-elif activity == "Breathing Exercise":
-    st.subheader("Breathing Exercise")
-    breath_inhale = st.button("Inhale for 4 seconds")
-    breath_hold = st.button("Hold for 7 seconds")
-    breath_exhale = st.button("Exhale for 8 seconds")
-
-    if breath_inhale:
-        st.write("Inhale for 4 seconds...")
-        time.sleep(4)
-        st.write("Hold your breath...")
-        time.sleep(7)
-        st.write("Exhale slowly...")
-        time.sleep(8)
-        st.write("Repeat this a few times to calm your mind.")
-
-elif activity == "Positive Affirmation":
-    st.subheader("Get a Positive Affirmation")
-    if st.button("Get Affirmation"):
-        st.write(random.choice(affirmations))
+@timed_fragment("activities")
+def activities_section():
+    # Options for games/activities
+    activity = st.selectbox("Choose an activity", ("Journaling", "Breathing Exercise", "Positive Affirmation"))
+
+    if activity == "Journaling":
+        st.subheader("Journaling Activity")
+        journal_entry = st.text_area("Write your thoughts here...", height=200)
+        if journal_entry:
+            st.write("Your thoughts today:")
+            st.write(journal_entry)
+        else:
+            st.write("Take your time to reflect and write...")
 
+    elif activity == "Breathing Exercise":
+        st.subheader("Breathing Exercise")
+        # The 4-7-8 timing runs in the browser, so the exercise never holds a server thread
+        components.html(BREATHING_EXERCISE_HTML, height=300)
 
+    elif activity == "Positive Affirmation":
+        st.subheader("Get a Positive Affirmation")
+        if st.button("Get Affirmation"):
+            st.write(random.choice(affirmations))
 
-# Initialize session state variables to track progress
-if 'points' not in st.session_state:
-    st.session_state.points = 0
-    st.session_state.badges = []
+activities_section()
 
 # List of tasks and their associated points
 tasks = {
@@ -311,92 +521,169 @@ tasks = {
 
 # Function to add points and badges
 def complete_task(task):
-    st.session_state.points += tasks[task]
-    st.session_state.badges.append(task)
+    session.increment("points", tasks[task])
+    session.stored_list("badges").append(task)
     st.success(f"🎉 Task '{task}' completed! You've earned {tasks[task]} points. Keep it up!")
 
 # Function to display badges with more style
 def display_badges():
-    if len(st.session_state.badges) > 0:
+    badges = list(session.stored_list("badges").entries())
+    if len(badges) > 0:
         st.subheader("🎖 Badges Earned:")
-        for badge in st.session_state.badges:
+        for badge in badges:
             st.markdown(f"**🏅 {badge}** - Well done!")
     else:
         st.write("No badges earned yet. Start completing tasks and collect your rewards!")
 
-# Display tasks
-st.title("Caregiver Progress Tracker")
-st.subheader("Track your caregiving activities and earn rewards!")
-
-# Button interactions for tasks
-for task, points in tasks.items():
-    if st.button(f"✅ Complete '{task}'"):
-        complete_task(task)
-
-# Display total points
-st.subheader(f"💎 Total Points: {st.session_state.points}")
-
-# Show progress bar with percentage
-total_points = sum(tasks.values())
-progress = (st.session_state.points / total_points) * 100
-progress = min(max(progress, 0), 100)  # Ensure progress stays within 0-100%
-
-# Animated progress bar
-progress_bar = st.progress(0)
-for i in range(int(progress) + 1):
-    time.sleep(0.05)  # Adds a small delay for the animation effect
-    progress_bar.progress(i)
-
-# Show progress percentage
-st.markdown(f"### Progress: {int(progress)}%")
-
-# Display badges and tasks completed
-display_badges()
-
-# Add motivational message
-if progress == 100:
-    st.balloons()
-    st.markdown("✨ Congratulations! You've completed all tasks and earned all possible points! ✨")
-else:
-    st.markdown("🎯 Keep going, you're doing great! More tasks, more rewards!")
-
-
-
-# resources list (videos + articles)
-resources = [
-    {"title": "Caring for Children with Special Needs", "link": "https://youtu.be/zcxGo6JXqRg", "type": "Video"},
-    {"title": "Caring for Children with Disabilities: A Caregiver’s Guide", "link": "https://youtu.be/cLoj-K8BGQA", "type": "Video"},
-    {"title": "Managing Stress as a Caregiver", "link": "https://www.caringbridge.org/resources/techniques-to-relieve-caregiver-stress", "type": "Article"},
-    {"title": "Raising a Child with Medical Complexity", "link": "https://blog.cincinnatichildrens.org/rare-and-complex-conditions/caring-for-a-medically-complex-child-your-resource-checklist/", "type": "Article"},
-    {"title": "Supporting Your Child’s Emotional Needs", "link": "https://youtu.be/nmqdQK3uPmg", "type": "Video"},
-    {"title": "Caregiver Self-Care Tips", "link": "https://www.nia.nih.gov/health/caregiving/taking-care-yourself-tips-caregivers", "type": "Article"},
-    {"title": "Managing Caregiver Burnout", "link": "https://youtu.be/Y3pKzjD4_7c", "type": "Video"},
-    {"title": "Caring for Your Child's Medical Needs: A Guide for Parents", "link": "https://childrenfirst.com/quality-care-for-your-child-with-complex-medical-needs/", "type": "Article"},
-    {"title": "Self-Care for Family Caregivers", "link": "https://www.caregiver.org/resource/taking-care-you-self-care-family-caregivers/", "type": "Article"}
-]
+@timed_fragment("progress")
+@sync_session_on_fragment_run
+def progress_section():
+    # Display tasks
+    st.title("Caregiver Progress Tracker")
+    st.subheader("Track your caregiving activities and earn rewards!")
+
+    # Button interactions for tasks
+    for task, points in tasks.items():
+        if st.button(f"✅ Complete '{task}'"):
+            complete_task(task)
+
+    # Display total points
+    points = session.counter("points")
+    st.subheader(f"💎 Total Points: {points}")
+
+    # Show progress bar with percentage
+    total_points = sum(tasks.values())
+    progress = (points / total_points) * 100
+    progress = min(max(progress, 0), 100)  # Ensure progress stays within 0-100%
+
+    # Progress bar: animated in the browser (CSS) only when the points just changed,
+    # otherwise drawn straight at its final value
+    previous_progress = st.session_state.get("drawn_progress", int(progress))
+    if previous_progress != int(progress):
+        st.markdown(f"""
+        <style>
+        @keyframes grow-progress {{
+            from {{ width: {previous_progress}%; }}
+            to {{ width: {int(progress)}%; }}
+        }}
+        </style>
+        <div style="background: #e0e0e0; border-radius: 8px; height: 10px; overflow: hidden;">
+            <div style="background: #7e57c2; height: 100%; width: {int(progress)}%; animation: grow-progress 1.5s ease-out;"></div>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.progress(int(progress))
+    st.session_state.drawn_progress = int(progress)
+
+    # Show progress percentage
+    st.markdown(f"### Progress: {int(progress)}%")
+
+    # Display badges and tasks completed
+    display_badges()
+
+    # Add motivational message
+    if progress == 100:
+        st.balloons()
+        st.markdown("✨ Congratulations! You've completed all tasks and earned all possible points! ✨")
+    else:
+        st.markdown("🎯 Keep going, you're doing great! More tasks, more rewards!")
+
+progress_section()
+
+
+
+# Resources (videos + articles) come from the catalog in resources.json, indexed once per process
+from resource_index import get_resource_index
+
+resource_index = get_resource_index()
+RESOURCE_PAGE_SIZE = 5
+FEATURED_RESOURCES = 10
 
 # Display the title and introduction
 st.title("Caregiver AI Support")
 st.write("Welcome to the Caregiver Support Chatbot. Explore resources to help you manage caregiving tasks and improve your well-being.")
 
-# Sidebar Search functionality
-st.sidebar.title("Search Resources")
-search_query = st.sidebar.text_input("Search for a topic...", "")
+def change_resource_page(step):
+    st.session_state.resource_page += step
 
-# Filter resources based on the search query
-filtered_resources = [resource for resource in resources if search_query.lower() in resource["title"].lower()]
+# Sidebar Search functionality
+@timed_fragment("resource search")
+def resource_search_section():
+    st.title("Search Resources")
+    search_query = st.text_input("Search for a topic...", "")
+    type_choice = st.selectbox("Type", ["All", "Article", "Video"])
+
+    # A new search starts again from the first page
+    if st.session_state.get("resource_search") != (search_query, type_choice):
+        st.session_state.resource_search = (search_query, type_choice)
+        st.session_state.resource_page = 0
+    page = st.session_state.resource_page
+    results, total = resource_index.search(
+        search_query, k=RESOURCE_PAGE_SIZE, offset=page * RESOURCE_PAGE_SIZE,
+        resource_type=None if type_choice == "All" else type_choice,
+    )
+
+    # Display the ranked resources in the sidebar
+    st.write("### Resources")
+    if results:
+        for resource in results:
+            st.markdown(f"- [{resource['title']}]({resource['link']}) ({resource['type']})")
+        first = page * RESOURCE_PAGE_SIZE + 1
+        st.caption(f"{first}–{first + len(results) - 1} of {total}")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("◀ Previous", disabled=page == 0, on_click=change_resource_page, args=(-1,))
+        with col2:
+            st.button("Next ▶", disabled=first + len(results) > total, on_click=change_resource_page, args=(1,))
+    else:
+        st.write("No resources found for your search.")
 
-# Display the filtered resources in the sidebar
-st.sidebar.write("### Resources")
-if filtered_resources:
-    for resource in filtered_resources:
-        st.sidebar.markdown(f"- [{resource['title']}]({resource['link']}) ({resource['type']})")
-else:
-    st.sidebar.write("No resources found for your search.")
+with st.sidebar:
+    resource_search_section()
 
 # Emotional Support Resources Section
 st.write("### Emotional Support Resources")
 st.write("Here are some helpful resources for caregivers of children with medical complexity:")
-for resource in resources:
+for resource in resource_index.resources[:FEATURED_RESOURCES]:
     st.markdown(f"- [{resource['title']}]({resource['link']}) ({resource['type']})")
 
+# Write this rerun's session changes in one batch
+session.flush()
+
+# ------------------ RERUN TIMINGS -------------------
+get_section_timer().record("full script", time.perf_counter() - script_started)
+
+@st.fragment
+def rerun_timings_report():
+    with st.expander("⏱ Rerun timings"):
+        st.button("🔄 Refresh report")
+        st.caption("Runs and duration per section. Full-script runs also run every section once.")
+        # A markdown table, so the first page does not pull in pandas and pyarrow
+        rows = get_section_timer().report()
+        if rows:
+            columns = list(rows[0])
+            st.markdown("\n".join(
+                ["| " + " | ".join(columns) + " |", "|" + " --- |" * len(columns)]
+                + ["| " + " | ".join(str(row[column]) for column in columns) + " |" for row in rows]
+            ))
+        if "first_render_seconds" in st.session_state:
+            st.caption(f"First page rendered in {st.session_state.first_render_seconds * 1000:.0f} ms.")
+        # Process-wide counters and histograms, for Prometheus to scrape
+        metrics_url = get_asset_server().add_endpoint("metrics", telemetry.render_prometheus, PROMETHEUS_CONTENT_TYPE)
+        if metrics_url and asset_server_reachable():
+            st.caption(f"[📊 Metrics (Prometheus)]({metrics_url})")
+        elif metrics_url:
+            st.caption("📊 Metrics are served at /metrics on the asset server; set CAREGIVER_ASSET_PUBLIC_URL "
+                       "to link them here.")
+
+with st.sidebar:
+    rerun_timings_report()
+
+# ------------------ WARM-UP -------------------
+# The first page has been sent: record how long it took, then start loading the models
+# (once per process)
+if "first_render_seconds" not in st.session_state:
+    st.session_state.first_render_seconds = time.perf_counter() - script_started
+    telemetry.observe("caregiver_first_render_seconds", st.session_state.first_render_seconds,
+                      cold="false" if warm_up.started else "true")
+warm_up.start()
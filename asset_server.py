@@ -0,0 +1,282 @@
+"""
+Small local HTTP server for static assets such as the background music, for streamed
+downloads such as chat-history exports, and for dynamic endpoints such as /metrics.
+
+Assets are streamed from disk with ETag, Last-Modified and Cache-Control headers and
+HTTP Range support, so browsers cache them and can seek in media, instead of the app
+inlining them into the page as base64 data: URIs on every rerun. Downloads are produced
+chunk by chunk by a callable when requested, so they are never held in memory whole.
+"""
+import mimetypes
+import os
+import re
+import secrets
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+ASSET_HOST = os.environ.get("CAREGIVER_ASSET_HOST", "127.0.0.1")
+ASSET_PORT = int(os.environ.get("CAREGIVER_ASSET_PORT", "8502"))
+# URL the browser uses to reach the server, e.g. when it sits behind a reverse proxy. Needed
+# whenever the browser is not on the server's machine; without it, callers fall back to
+# Streamlit's own media and download elements
+ASSET_PUBLIC_URL = os.environ.get("CAREGIVER_ASSET_PUBLIC_URL")
+ASSET_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+CACHE_MAX_AGE = 24 * 60 * 60
+CHUNK_SIZE = 64 * 1024
+MAX_DOWNLOADS = 1000
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class AssetRequestHandler(BaseHTTPRequestHandler):
+    server_version = "CaregiverAssets/1.0"
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _serve(self, send_body):
+        name = unquote(urlsplit(self.path).path).lstrip("/")
+        endpoint = self.server.endpoints.get(name)
+        if endpoint is not None:
+            self._serve_endpoint(endpoint, send_body)
+            return
+        download = self.server.downloads.get(name)
+        if download is not None:
+            self._serve_download(download, send_body)
+            return
+
+        path = self.server.assets.get(name)
+        try:
+            stat = os.stat(path) if path else None
+        except OSError:
+            stat = None
+        if stat is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        size = stat.st_size
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._send_cache_headers(etag, stat)
+            self.end_headers()
+            return
+
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range", etag) == etag:
+            byte_range = self._parse_range(range_header, size)
+            if byte_range is None:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            start, end = byte_range
+            status = HTTPStatus.PARTIAL_CONTENT
+
+        self.send_response(status)
+        self.send_header("Content-Type", mimetypes.guess_type(name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self._send_cache_headers(etag, stat)
+        self.end_headers()
+        if not send_body:
+            return
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            try:
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The browser stopped reading, e.g. after seeking elsewhere
+
+    def _serve_endpoint(self, endpoint, send_body):
+        render, content_type = endpoint
+        try:
+            body = render().encode("utf-8")
+        except Exception as e:
+            print(f"Error rendering {self.path}: {e}")
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _serve_download(self, download, send_body):
+        chunks, content_type, filename = download
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if not send_body:
+            return
+        # HTTP/1.0 response without Content-Length: the body ends when the connection closes
+        try:
+            for chunk in chunks():
+                self.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_cache_headers(self, etag, stat):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(stat.st_mtime, usegmt=True))
+        self.send_header("Cache-Control", f"public, max-age={CACHE_MAX_AGE}")
+
+    @staticmethod
+    def _parse_range(header, size):
+        """
+        Parse a single-range "bytes=start-end" header into inclusive offsets, or None if it
+        cannot be satisfied. Multi-range requests are answered with the first range only.
+        """
+        match = _RANGE.match(header.split(",")[0].strip())
+        if not match or size == 0:
+            return None
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            return None
+        return (start, end) if start <= end else None
+
+
+class AssetServer:
+    """
+    Serves a fixed set of registered files and downloads; nothing else in the directory is
+    reachable. The server thread is only started when the first URL is requested.
+    """
+
+    def __init__(self, directory=ASSET_DIRECTORY, host=ASSET_HOST, port=ASSET_PORT, public_url=ASSET_PUBLIC_URL):
+        self.directory = directory
+        self.host = host
+        self.port = port
+        self.public_url = public_url
+        self._assets = {}
+        self._downloads = OrderedDict()
+        self._endpoints = {}
+        self._httpd = None
+        self._start_failed = False
+        self._lock = threading.Lock()
+
+    def reachable_from(self, page_host):
+        """
+        Whether a browser can follow this server's URLs: a public URL is configured, or the
+        page itself was opened on this machine, so localhost:<port> leads here.
+        :param page_host: Host header of the page request, e.g. "localhost:8501"
+        """
+        if self.public_url:
+            return True
+        return urlsplit(f"//{page_host or ''}").hostname in ("localhost", "127.0.0.1", "::1")
+
+    def url_for(self, filename):
+        """
+        Return the URL of a file in the asset directory, starting the server if needed.
+        :return: The URL, or None if the file is missing or the server cannot be started
+        """
+        path = os.path.join(self.directory, filename)
+        if os.path.basename(filename) != filename or not os.path.isfile(path):
+            return None
+        if not self._ensure_started():
+            return None
+        self._assets[filename] = path
+        return f"{self._base_url()}/{quote(filename)}"
+
+    def download_url(self, filename, chunks, content_type="application/octet-stream"):
+        """
+        Register a streamed download under an unguessable URL.
+        :param filename: File name suggested to the browser
+        :param chunks: Zero-argument callable returning an iterable of bytes, called per request
+        :return: The URL, or None if the server cannot be started
+        """
+        if not self._ensure_started():
+            return None
+        name = f"downloads/{secrets.token_urlsafe(16)}/{filename}"
+        with self._lock:
+            self._downloads[name] = (chunks, content_type, filename)
+            while len(self._downloads) > MAX_DOWNLOADS:
+                self._downloads.popitem(last=False)
+        return f"{self._base_url()}/{quote(name)}"
+
+    def add_endpoint(self, name, render, content_type="text/plain; charset=utf-8"):
+        """
+        Serve the text returned by `render()` at /`name`, rendered afresh on every request.
+        :return: The URL, or None if the server cannot be started
+        """
+        if not self._ensure_started():
+            return None
+        self._endpoints[name] = (render, content_type)
+        return f"{self._base_url()}/{quote(name)}"
+
+    def _base_url(self):
+        return (self.public_url or f"http://{self._url_host()}:{self._httpd.server_address[1]}").rstrip("/")
+
+    def _url_host(self):
+        return "localhost" if self.host in ("127.0.0.1", "0.0.0.0", "") else self.host
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._httpd is None:
+                if self._start_failed:
+                    return False
+                try:
+                    httpd = ThreadingHTTPServer((self.host, self.port), AssetRequestHandler)
+                except OSError as e:
+                    print(f"Error starting the asset server: {e}")
+                    self._start_failed = True
+                    return False
+                httpd.daemon_threads = True
+                httpd.assets = self._assets
+                httpd.downloads = self._downloads
+                httpd.endpoints = self._endpoints
+                threading.Thread(target=httpd.serve_forever, name="asset-server", daemon=True).start()
+                self._httpd = httpd
+            return True
+
+    def close(self):
+        with self._lock:
+            if self._httpd is not None:
+                self._httpd.shutdown()
+                self._httpd.server_close()
+                self._httpd = None
+
+
+_asset_server = None
+_asset_server_lock = threading.Lock()
+
+
+def get_asset_server():
+    """
+    Return the process-wide asset server.
+    """
+    global _asset_server
+    with _asset_server_lock:
+        if _asset_server is None:
+            _asset_server = AssetServer()
+        return _asset_server
@@ -0,0 +1,141 @@
+"""
+Micro-benchmark: compiled intent table vs the original if/elif keyword chain.
+
+Run from the repository root:
+    python benchmarks/bench_intents.py [--messages 20000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import DEFAULT_MATCHER, INTENTS, Intent, IntentMatcher, reply_for  # noqa: E402
+
+FILLER = (
+    "today was long and the kids had a rough night so i barely slept "
+    "we went to the clinic again and the waiting room was packed"
+).split()
+
+
+def legacy_process_message(message, tone):
+    message = message.lower()
+
+    if tone == "soft":
+        if "overwhelmed" in message or "tired" in message or "stress" in message:
+            return "😔 Hmm... that sounds really tough. Caregiving can be so exhausting sometimes. You're doing your best, and that's more than enough. I'm here for you 💛"
+        elif "medication" in message or "pill" in message:
+            return "💊 Got it. Medication can be tricky, right? Do you need help keeping track of doses or timing? I'm here to help you sort it out 👍"
+        elif "appointment" in message or "reminder" in message:
+            return "📅 Of course! I can help with that. Would you like me to set up a gentle reminder for upcoming appointments? 😊"
+        elif "lonely" in message:
+            return "💙 Ouch... loneliness is hard. Just know you’re not alone right now. I'm right here with you. Want to talk a little more? 🫂"
+        elif "angry" in message or "frustrated" in message:
+            return "😤 Ugh, I get that. It’s completely okay to feel frustrated. Want to vent a bit? I’m here to listen."
+        elif "sad" in message or "cry" in message:
+            return "😭 I’m so sorry you’re feeling this way. It’s okay to cry—it means you care deeply. Sending you a big virtual hug 🤗"
+        elif "thank" in message:
+            return "😊 Aww, you're very welcome! I'm really glad I could help 💖"
+        elif "help" in message:
+            return "🤝 Sure thing! Just tell me what you need and I’ll do my best to be useful."
+        elif "task" in message or "what are my care tasks" in message or "show tasks" in message:
+            return "📋 Here are your scheduled care tasks. Please check the section below."
+        else:
+            return "🫶 You're doing great, seriously. Being a caregiver isn’t easy. How else can I support you today?"
+
+    elif tone == "directive":
+        if "overwhelmed" in message or "tired" in message or "stress" in message:
+            return "💡 Let's take a breath. Start by listing your top 3 priorities. Together, we can find a way to manage this better."
+        elif "medication" in message or "pill" in message:
+            return "📋 Let’s make a simple schedule for medication tracking. Do you want a reminder every day or just weekly?"
+        elif "appointment" in message or "reminder" in message:
+            return "✅ Let’s organize your upcoming appointments. You can create a digital note or calendar entry — I’ll guide you if needed."
+        elif "lonely" in message:
+            return "🤝 Feeling lonely is valid. I suggest reaching out to a support group or friend. Would you like a resource link?"
+        elif "angry" in message or "frustrated" in message:
+            return "⚠️ Anger is a signal. Let’s channel that into action — maybe write down what triggered it and how to prevent it."
+        elif "sad" in message or "cry" in message:
+            return "📘 When sadness hits, journaling or a short walk can help. Want me to suggest a reflection prompt?"
+        elif "thank" in message:
+            return "✅ I’m always ready to assist. Let’s keep going strong!"
+        elif "help" in message:
+            return "🚀 Just let me know what task or challenge you're dealing with — and we’ll tackle it step by step."
+        elif "task" in message or "what are my care tasks" in message or "show tasks" in message:
+            return "📋 Here are your scheduled care tasks. Please check the section below."
+        else:
+            return "🛠️ What would you like to work on next? You’ve got this — and I’ve got your back."
+
+
+def compiled_process_message(message, tone):
+    return reply_for(DEFAULT_MATCHER.match(message.lower()), tone)
+
+
+def chain_match(intents, message):
+    """
+    The if/elif chain generalised to any intent table: one substring scan per keyword.
+    """
+    for intent in intents:
+        if any(keyword in message for keyword in intent.keywords):
+            return intent
+    return None
+
+
+def grown_table(extra_keywords, seed=0):
+    """
+    Return INTENTS plus synthetic low-priority intents carrying `extra_keywords` keywords.
+    """
+    rng = random.Random(seed)
+    words = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(5, 10))) for _ in range(extra_keywords)]
+    extra = [Intent(f"synthetic-{i}", tuple(words[i:i + 5]), {}) for i in range(0, len(words), 5)]
+    return INTENTS + tuple(extra)
+
+
+def synthetic_corpus(size, seed=0):
+    """
+    Build messages of varying length; about half contain one or more intent keywords.
+    """
+    rng = random.Random(seed)
+    keywords = [keyword for intent in INTENTS for keyword in intent.keywords]
+    corpus = []
+    for _ in range(size):
+        words = rng.choices(FILLER, k=rng.randint(3, 40))
+        for _ in range(rng.choice((0, 0, 1, 2))):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords).upper())
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--extra-keywords", type=int, nargs="*", default=[100, 1000],
+        help="also time intent matching on tables grown by this many synthetic keywords",
+    )
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.messages)
+    for tone in ("soft", "directive"):
+        for message in corpus:
+            assert legacy_process_message(message, tone) == compiled_process_message(message, tone), message
+
+    print(f"{len(corpus)} messages, best of {args.repeat} runs (replies verified identical)")
+    for name, func in (("legacy if/elif chain", legacy_process_message), ("compiled intent table", compiled_process_message)):
+        for tone in ("soft", "directive"):
+            best = min(timeit.repeat(lambda: [func(m, tone) for m in corpus], number=1, repeat=args.repeat))
+            print(f"{name:<24} {tone:<10} {best * 1000:8.1f} ms  {len(corpus) / best:12,.0f} msg/s")
+
+    lowered = [message.lower() for message in corpus]
+    for extra in args.extra_keywords:
+        table = grown_table(extra)
+        matcher = IntentMatcher(table)
+        chain = min(timeit.repeat(lambda: [chain_match(table, m) for m in lowered], number=1, repeat=args.repeat))
+        compiled = min(timeit.repeat(lambda: [matcher.match(m) for m in lowered], number=1, repeat=args.repeat))
+        print(f"+{extra} keywords: substring chain {chain * 1000:8.1f} ms, compiled matcher {compiled * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
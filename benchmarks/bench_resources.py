@@ -0,0 +1,91 @@
+"""
+Micro-benchmark: resource search latency as the catalog grows, indexed BM25 vs the
+original substring scan over titles.
+
+Run from the repository root:
+    python benchmarks/bench_resources.py [--sizes 1000 10000 50000] [--queries 500]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resource_index import ResourceIndex, load_resources  # noqa: E402
+
+QUERIES = ("stress", "burnout", "lonely support", "medication schedule", "self care", "appointmnet", "sleep",
+           "feeding tube", "sad", "respite care")
+VOCABULARY = (
+    "care caregiver child children medical complexity stress burnout lonely support group medication schedule "
+    "appointment therapy feeding tube sleep night nurse respite family sibling school insurance equipment "
+    "wheelchair seizure breathing oxygen hospital discharge home emotions sad angry frustrated tired coping"
+).split()
+
+
+def synthetic_catalog(size, seed=0):
+    """
+    Return the real catalog followed by synthetic resources up to `size` entries.
+    """
+    rng = random.Random(seed)
+    # Caregiving words followed by a long tail of rarer made-up ones, drawn with Zipf-like
+    # frequencies as in real text
+    words = list(VOCABULARY) + [
+        "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(4, 10))) for _ in range(20000)
+    ]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+
+    def text(count):
+        return " ".join(rng.choices(words, weights, k=count))
+
+    catalog = load_resources()
+    while len(catalog) < size:
+        catalog.append({
+            "title": text(rng.randint(3, 8)).capitalize(),
+            "link": f"https://example.org/resources/{len(catalog)}",
+            "type": rng.choice(("Article", "Video")),
+            "language": rng.choice(("en", "en", "en", "fr", "es")),
+            "tags": text(3).split(),
+            "description": text(rng.randint(10, 30)),
+        })
+    return catalog[:size]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        catalog = synthetic_catalog(size)
+        start = time.perf_counter()
+        index = ResourceIndex(catalog)
+        build = time.perf_counter() - start
+
+        indexed, scanned = [], []
+        for i in range(args.queries):
+            query = QUERIES[i % len(QUERIES)]
+            start = time.perf_counter()
+            index.search(query, k=args.k)
+            indexed.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            [resource for resource in catalog if query.lower() in resource["title"].lower()]
+            scanned.append(time.perf_counter() - start)
+
+        print(f"{size:>7} resources (index built in {build * 1000:.0f} ms)")
+        for name, samples in (("BM25 index", indexed), ("substring scan", scanned)):
+            print(f"    {name:<16} p50 {statistics.median(samples) * 1000:7.2f} ms  "
+                  f"p99 {percentile(samples, 0.99) * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Load generator for the HTTP API in api.py.
+
+Starts the API in-process on a free local port (or targets --url), then fires a mix of
+message, sentiment and language requests from concurrent clients and reports throughput,
+p50/p99 latency and how many requests were turned away with 429. Run from the repository
+root:
+    python benchmarks/load_api.py [--clients 32] [--requests 50] [--workers 4] [--queue-size 32]
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MESSAGES = [
+    "I feel overwhelmed with everything today",
+    "Can you remind me about her appointment?",
+    "She refused her medication again",
+    "We had a good day at the park",
+    "Je suis tellement fatiguée ce soir",
+]
+
+
+def request_mix(n):
+    """
+    Return the (path, body) of the n-th request in the mix.
+    """
+    message = f"{MESSAGES[n % len(MESSAGES)]} #{n}"
+    kind = n % 4
+    if kind == 0:
+        return "/message", {"message": message, "tone": "soft"}
+    if kind == 1:
+        return "/sentiment", {"message": message}
+    if kind == 2:
+        return "/sentiment/batch", {"messages": [f"{m} #{n}" for m in MESSAGES]}
+    return "/language", {"text": message}
+
+
+def post(url, body):
+    data = json.dumps(body).encode("utf-8")
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def start_local_server(workers, queue_size):
+    from werkzeug.serving import make_server
+
+    # Keep per-request access logs out of the report
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    from api import create_app
+    from model_registry import get_model_registry
+
+    get_model_registry().warm_up(background=False)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = make_server("127.0.0.1", port, create_app(workers=workers, queue_size=queue_size), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="base URL of a running API; starts one in-process when omitted")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=32)
+    args = parser.parse_args()
+
+    base_url = args.url or start_local_server(args.workers, args.queue_size)
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def client(client_id):
+        own_latencies, own_statuses = [], Counter()
+        for i in range(args.requests):
+            path, body = request_mix(client_id * args.requests + i)
+            started = time.perf_counter()
+            status = post(base_url + path, body)
+            own_statuses[status] += 1
+            if status == 200:
+                own_latencies.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(own_latencies)
+            statuses.update(own_statuses)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.clients} clients x {args.requests} requests against {base_url}")
+    print(f"status codes: {dict(sorted(statuses.items()))}")
+    print(
+        f"{len(latencies) / elapsed:8.1f} successful req/s  "
+        f"p50 {percentile(latencies, 0.50) * 1000:7.1f} ms  p99 {percentile(latencies, 0.99) * 1000:7.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Load test for CaregiverChatbot.analyze_sentiment with and without micro-batching.
+
+Simulates concurrent sessions, each sending sentiment requests back to back, and reports
+throughput and p50/p99 latency per mode. Every message is unique so the sentiment cache
+never answers for the model. Run from the repository root:
+    python benchmarks/load_sentiment.py [--sessions 32] [--requests 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caregiver_chatbot import CaregiverChatbot  # noqa: E402
+
+MESSAGES = [
+    "I feel overwhelmed with everything today",
+    "Thank you, that really helped",
+    "She refused her medication again and I don't know what to do",
+    "We had a good day at the park",
+    "I'm so tired I could cry",
+    "The new feeding schedule is working well",
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def run(batch_sentiment, sessions, requests_per_session):
+    latencies = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(sessions + 1)
+
+    def session(session_id):
+        chatbot = CaregiverChatbot(batch_sentiment=batch_sentiment)
+        own = []
+        start_barrier.wait()
+        for n in range(requests_per_session):
+            message = f"{MESSAGES[n % len(MESSAGES)]} ({batch_sentiment}:{session_id}:{n}:{time.perf_counter_ns()})"
+            started = time.perf_counter()
+            chatbot.analyze_sentiment(message)
+            own.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32, help="concurrent sessions (threads)")
+    parser.add_argument("--requests", type=int, default=20, help="requests per session")
+    args = parser.parse_args()
+
+    # Load the models and start the batcher before timing anything
+    CaregiverChatbot().analyze_sentiment("warm up")
+
+    print(f"{args.sessions} sessions x {args.requests} requests")
+    for label, batch_sentiment in (("unbatched", False), ("batched", True)):
+        result = run(batch_sentiment, args.sessions, args.requests)
+        print(
+            f"{label:<10} {result['throughput']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+            f"p99 {result['p99_ms']:7.1f} ms  mean {result['mean_ms']:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
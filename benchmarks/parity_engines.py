@@ -0,0 +1,156 @@
+"""
+Parity check of the inference engines against PyTorch fp32.
+
+Each engine is loaded in its own process, so its load time and resident memory are not
+mixed up with the other engines'. On a fixed corpus of caregiver messages it reports, per
+engine, sentiment label agreement and score drift against fp32, greedy-generation token
+agreement, and sentiment and generation latency. Run from the repository root:
+    python benchmarks/parity_engines.py [--engines torch int8 onnx] [--max-new-tokens 20]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_engines import ENGINES  # noqa: E402
+
+CORPUS = [
+    "I feel overwhelmed with everything today",
+    "Thank you, that really helped",
+    "She refused her medication again and I don't know what to do",
+    "We had a good day at the park",
+    "I'm so tired I could cry",
+    "The new feeding schedule is working well",
+    "I haven't slept properly in weeks",
+    "The nurse was so kind to us this morning",
+    "I'm angry that the insurance denied the wheelchair again",
+    "He smiled at me for the first time in days",
+    "I feel lonely, nobody understands what we go through",
+    "The appointment went better than I expected",
+    "I keep forgetting which pill is due at noon",
+    "My other kids feel left out and I feel guilty",
+    "We finally got the home oxygen set up",
+    "I'm frustrated with the hospital discharge process",
+    "Some days I don't know how much longer I can do this",
+    "The therapist gave us great exercises to try",
+    "I'm scared about the surgery next week",
+    "Today was calm and I even had time to read",
+]
+GENERATION_PROMPTS = CORPUS[:8]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def measure(engine, max_new_tokens):
+    """
+    Load both models on `engine` and run the corpus through them. Runs in a fresh process.
+    """
+    from generation import build_prompt
+    from model_registry import ModelRegistry, current_rss_bytes
+
+    rss_before = current_rss_bytes()
+    registry = ModelRegistry(engine=engine)
+    started = time.perf_counter()
+    analyzer = registry.sentiment()
+    model, tokenizer = registry.generation()
+    load_seconds = time.perf_counter() - started
+
+    analyzer(CORPUS[:2])  # Warm-up outside the timings
+    latencies = []
+    sentiments = []
+    for message in CORPUS:
+        started = time.perf_counter()
+        sentiments.append(analyzer(message)[0])
+        latencies.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    analyzer(CORPUS, batch_size=len(CORPUS))
+    batch_seconds = time.perf_counter() - started
+
+    generations = []
+    generation_seconds = 0.0
+    generated_tokens = 0
+    for message in GENERATION_PROMPTS:
+        inputs = tokenizer(build_prompt(message, "soft"), return_tensors="pt", return_token_type_ids=False)
+        started = time.perf_counter()
+        output = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                                pad_token_id=tokenizer.eos_token_id)
+        generation_seconds += time.perf_counter() - started
+        new_tokens = output[0, inputs["input_ids"].shape[-1]:].tolist()
+        generated_tokens += len(new_tokens)
+        generations.append(new_tokens)
+
+    return {
+        "engine": registry.engine,
+        "load_seconds": load_seconds,
+        "rss_mb": (current_rss_bytes() - rss_before) / 2**20,
+        "sentiments": sentiments,
+        "sentiment_p50_ms": statistics.median(latencies) * 1000,
+        "sentiment_p99_ms": percentile(latencies, 0.99) * 1000,
+        "sentiment_batch_ms": batch_seconds * 1000,
+        "generations": generations,
+        "tokens_per_second": generated_tokens / generation_seconds if generation_seconds else 0.0,
+    }
+
+
+def common_prefix(a, b):
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engines", nargs="*", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--max-new-tokens", type=int, default=20)
+    args = parser.parse_args()
+
+    engines = ["torch"] + [engine for engine in args.engines if engine != "torch"]
+    results = {}
+    for engine in engines:
+        # A fresh process per engine: clean RSS figures, and the first start of the ONNX
+        # engine includes its export
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            try:
+                results[engine] = executor.submit(measure, engine, args.max_new_tokens).result()
+            except Exception as e:
+                print(f"Error running the {engine} engine: {e}")
+
+    reference = results.get("torch")
+    if reference is None:
+        return
+    print(f"{len(CORPUS)} sentiment messages, {len(GENERATION_PROMPTS)} greedy generations "
+          f"of up to {args.max_new_tokens} tokens; agreement and drift are against torch fp32")
+    print(f"{'engine':<7} {'load s':>7} {'RSS MB':>7} {'labels':>7} {'max drift':>9} {'mean drift':>10} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'batch ms':>9} {'gen exact':>9} {'gen prefix':>10} {'tok/s':>7}")
+    for engine, result in results.items():
+        pairs = list(zip(reference["sentiments"], result["sentiments"]))
+        agreement = sum(ref["label"] == got["label"] for ref, got in pairs) / len(pairs)
+        # Drift in P(POSITIVE), so a flipped label with similar confidence still counts as drift
+        drifts = [
+            abs((ref["score"] if ref["label"] == "POSITIVE" else 1 - ref["score"])
+                - (got["score"] if got["label"] == "POSITIVE" else 1 - got["score"]))
+            for ref, got in pairs
+        ]
+        exact = sum(ref == got for ref, got in zip(reference["generations"], result["generations"]))
+        prefix = statistics.fmean(
+            common_prefix(ref, got) / max(len(ref), 1) for ref, got in zip(reference["generations"], result["generations"])
+        )
+        print(f"{engine:<7} {result['load_seconds']:7.1f} {result['rss_mb']:7.0f} {agreement:7.0%} "
+              f"{max(drifts):9.4f} {statistics.fmean(drifts):10.4f} {result['sentiment_p50_ms']:7.1f} "
+              f"{result['sentiment_p99_ms']:7.1f} {result['sentiment_batch_ms']:9.1f} "
+              f"{exact:>4}/{len(GENERATION_PROMPTS):<4} {prefix:10.0%} {result['tokens_per_second']:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
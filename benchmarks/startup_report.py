@@ -0,0 +1,148 @@
+"""
+Cold-start report for app.py: how long the first page takes and which imports it pays for.
+
+Starts a fresh interpreter with `python -X importtime`, renders app.py once through
+Streamlit's AppTest harness and reports the time to first render, the slowest imports
+made by the app before it, and whether a heavy library (torch, transformers, ...) was
+among them. The exit status is 1 when the first render is over --budget-ms or imports a
+library listed in --forbid. Run from the repository root:
+    python benchmarks/startup_report.py [--budget-ms 3000] [--top 15]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HARNESS_READY = "@@ harness imported"
+FIRST_RENDER = "@@ first render"
+DEFAULT_FORBIDDEN = ("torch", "transformers", "optimum", "onnxruntime", "langdetect", "pandas", "PIL")
+
+# Runs in the child interpreter. The markers on stderr split the import log into the
+# harness's own imports, the imports made by the first render, and later ones (warm-up).
+CHILD = f"""
+import json, os, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+sys.stderr.write("{HARNESS_READY}\\n")
+sys.stderr.flush()
+harness_seconds = time.perf_counter() - started
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+app.run()
+render_seconds = time.perf_counter() - started - harness_seconds
+sys.stderr.write("{FIRST_RENDER}\\n")
+sys.stderr.flush()
+print(json.dumps({{"harness_seconds": harness_seconds, "render_seconds": render_seconds,
+                  "errors": [exception.message for exception in app.exception]}}))
+sys.stdout.flush()
+os._exit(0)  # Leave the warm-up thread behind instead of waiting for it to finish
+"""
+
+
+def parse_import_line(line):
+    """
+    Parse a `-X importtime` line into (depth, module, self µs, cumulative µs), or None.
+    """
+    if not line.startswith("import time:"):
+        return None
+    try:
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        return depth, name.strip(), int(self_us), int(cumulative_us)
+    except ValueError:
+        return None  # The header line
+
+
+def run_child(app_path):
+    """
+    Render the app once in a fresh interpreter.
+    :return: (child's JSON report, import lines made by the first render)
+    """
+    # The warm-up thread, started once the first page is out, is held back so its imports
+    # cannot be mistaken for the first render's
+    env = dict(os.environ, PYTHONPATH=REPO_DIRECTORY, CAREGIVER_WARM_UP_DELAY="3600")
+    process = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "-c", CHILD, app_path],
+        cwd=REPO_DIRECTORY, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    phase = "harness"
+    render_imports = []
+    for line in process.stderr:
+        line = line.rstrip("\n")
+        if line == HARNESS_READY:
+            phase = "render"
+        elif line == FIRST_RENDER:
+            phase = "after"
+        elif phase == "render":
+            parsed = parse_import_line(line)
+            if parsed:
+                render_imports.append(parsed)
+    output = process.stdout.read()
+    process.wait()
+    if process.returncode != 0 or not output.strip():
+        raise RuntimeError(f"Rendering {app_path} failed with exit status {process.returncode}")
+    return json.loads(output.strip().splitlines()[-1]), render_imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", default=os.path.join(REPO_DIRECTORY, "app.py"))
+    parser.add_argument("--budget-ms", type=float, default=3000, help="maximum time to first render")
+    parser.add_argument("--forbid", nargs="*", default=list(DEFAULT_FORBIDDEN),
+                        help="top-level packages the first render must not import")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    launched = time.perf_counter()
+    report, imports = run_child(args.app)
+    wall_seconds = time.perf_counter() - launched
+
+    top_level = sorted((entry for entry in imports if entry[0] == 0), key=lambda entry: -entry[3])
+    packages = {name.split(".")[0] for _, name, _, _ in imports}
+    forbidden = sorted(packages & set(args.forbid))
+    render_ms = report["render_seconds"] * 1000
+    import_ms = sum(cumulative for _, _, _, cumulative in top_level) / 1000
+
+    print(f"Time to first render:        {render_ms:8.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"  of which imports:          {import_ms:8.0f} ms in {len(imports)} modules")
+    print(f"Streamlit test harness:      {report['harness_seconds'] * 1000:8.0f} ms (not counted)")
+    print(f"Process start to first page: {wall_seconds * 1000:8.0f} ms (importtime logging inflates this)")
+    print("\nSlowest imports made by the first render (cumulative):")
+    for _, name, _, cumulative in top_level[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    for error in report["errors"]:
+        print(f"\nError rendering the app: {error}")
+
+    failures = []
+    if render_ms > args.budget_ms:
+        failures.append(f"first render took {render_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    if forbidden:
+        failures.append(f"first render imported {', '.join(forbidden)}")
+    if report["errors"]:
+        failures.append("the app raised an exception")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "render_ms": render_ms,
+                "import_ms": import_ms,
+                "wall_ms": wall_seconds * 1000,
+                "budget_ms": args.budget_ms,
+                "forbidden_imports": forbidden,
+                "slowest_imports": [{"module": name, "cumulative_ms": cumulative / 1000}
+                                    for _, name, _, cumulative in top_level[:args.top]],
+                "errors": report["errors"],
+            }, f, indent=2)
+            f.write("\n")
+
+    if failures:
+        print("\nOver budget: " + "; ".join(failures))
+        sys.exit(1)
+    print("\nWithin budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Benchmark suite for the caregiver chatbot, runnable offline on tiny stand-in models.
+
+Covers chatbot construction (cold and warm), process_message throughput per tone,
+sentiment scoring and intent classification one message at a time vs in one batch, get_mood_df at several history
+sizes read back from the session store (--session-backend), and full reruns of app.py through Streamlit's AppTest harness. Results are written
+as JSON; pass a previous results file as --baseline to compare against it, and the exit
+status is 1 when a metric got worse by more than --tolerance. Run from the repository root:
+    python benchmarks/suite.py [--output results.json] [--baseline baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+REPO_DIRECTORY = os.path.dirname(BENCHMARK_DIRECTORY)
+sys.path.insert(0, REPO_DIRECTORY)
+
+DEFAULT_OUTPUT = os.path.join(REPO_DIRECTORY, "data", "benchmarks", "latest.json")
+DEFAULT_MODELS_DIRECTORY = os.path.join(REPO_DIRECTORY, "data", "tiny_models")
+GROUPS = ("init", "process_message", "sentiment", "intents", "mood_df", "app_rerun")
+
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def median_time(func, repeat):
+    return statistics.median(timed(func) for _ in range(repeat))
+
+
+def metric(value, unit, higher_is_better=False):
+    return {"value": round(value, 4), "unit": unit, "higher_is_better": higher_is_better}
+
+
+def bench_init(args):
+    from caregiver_chatbot import CaregiverChatbot
+    from model_registry import ModelRegistry
+
+    # Cold: a fresh registry, so construction includes loading the sentiment model. The
+    # language model is left out: only generative chatbots load it
+    cold = statistics.median(timed(lambda: CaregiverChatbot(registry=ModelRegistry())) for _ in range(args.repeat))
+    registry = ModelRegistry()
+    CaregiverChatbot(registry=registry)
+    warm = median_time(lambda: CaregiverChatbot(registry=registry), args.repeat * 20)
+    return {"init.cold_ms": metric(cold * 1000, "ms"), "init.warm_ms": metric(warm * 1000, "ms")}
+
+
+def bench_process_message(args):
+    from bench_intents import synthetic_corpus
+    from caregiver_chatbot import CaregiverChatbot
+    from intent_classifier import EmbeddingIntentClassifier
+    from model_registry import get_model_registry
+
+    corpus = synthetic_corpus(args.messages)
+    results = {}
+    for tone in ("soft", "directive"):
+        # The process-wide classifier caches its matches, so the second tone would only
+        # measure cache hits; each tone classifies every message itself
+        classifier = EmbeddingIntentClassifier(get_model_registry(), cache_size=0)
+        classifier.warm_up()
+        chatbot = CaregiverChatbot(tone=tone, intent_matcher=classifier)
+        seconds = median_time(lambda: [chatbot.process_message(message) for message in corpus], args.repeat)
+        results[f"process_message.{tone}.msgs_per_s"] = metric(len(corpus) / seconds, "msg/s", higher_is_better=True)
+    return results
+
+
+def bench_sentiment(args):
+    from bench_intents import synthetic_corpus
+    from caregiver_chatbot import CaregiverChatbot
+
+    chatbot = CaregiverChatbot(batch_sentiment=False)
+    chatbot.analyze_sentiment("warm up")
+
+    def unique_messages(run):
+        # Fresh text every run, so the sentiment cache never answers for the model
+        return [f"{message} #{run}-{i}" for i, message in enumerate(synthetic_corpus(args.sentiment_messages))]
+
+    single, batch = [], []
+    for run in range(args.repeat):
+        messages = unique_messages(f"single{run}")
+        single.append(timed(lambda: [chatbot.analyze_sentiment(message) for message in messages]) / len(messages))
+        messages = unique_messages(f"batch{run}")
+        batch.append(timed(lambda: chatbot.analyze_sentiments(messages)) / len(messages))
+    return {
+        "sentiment.single_ms_per_message": metric(statistics.median(single) * 1000, "ms"),
+        "sentiment.batch_ms_per_message": metric(statistics.median(batch) * 1000, "ms"),
+    }
+
+
+def bench_intents(args):
+    from bench_intents import synthetic_corpus
+    from intent_classifier import EmbeddingIntentClassifier
+    from model_registry import get_model_registry
+
+    classifier = EmbeddingIntentClassifier(get_model_registry(), cache_size=0)
+    classifier.warm_up()
+    messages = synthetic_corpus(args.sentiment_messages)
+    single = median_time(lambda: [classifier.match_many([message]) for message in messages], args.repeat)
+    batch = median_time(lambda: classifier.match_many(messages), args.repeat)
+    return {
+        "intents.single_ms_per_message": metric(single / len(messages) * 1000, "ms"),
+        "intents.batch_ms_per_message": metric(batch / len(messages) * 1000, "ms"),
+    }
+
+
+def bench_mood_df(args):
+    from bench_intents import synthetic_corpus
+    from caregiver_chatbot import CaregiverChatbot
+    from mood import get_mood_df
+    from session_store import MemorySessionBackend, SessionState, SQLiteSessionBackend
+
+    chatbot = CaregiverChatbot()
+    chatbot.analyze_sentiment("warm up")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        if args.session_backend == "memory":
+            backend = MemorySessionBackend()
+        else:
+            backend = SQLiteSessionBackend(os.path.join(directory, "sessions.db"))
+        for size in args.mood_sizes:
+            cold, warm = [], []
+            for run in range(args.repeat):
+                session_id = f"mood-{size}-{run}"
+                writer = SessionState(session_id, backend)
+                chat_log = writer.chat_log()
+                for i, message in enumerate(synthetic_corpus(size, seed=run)):
+                    chat_log.append("You" if i % 2 == 0 else "Bot", f"{message} #{size}-{run}-{i}")
+                writer.flush()
+
+                session = SessionState(session_id, backend)
+
+                def rerun():
+                    # As one app rerun: fresh reads, the dashboard, then the write-back
+                    session.refresh()
+                    get_mood_df(chatbot, session.chat_log(), session.stored_list("mood_history"))
+                    session.flush()
+
+                # Cold: every user message is scored; warm: nothing new since the last call
+                cold.append(timed(rerun))
+                warm.append(timed(rerun))
+                # The history must have survived the write-back and be scored once per user message
+                reader = SessionState(session_id, backend)
+                if len(reader.chat_log()) != size or len(reader.stored_list("mood_history")) != (size + 1) // 2:
+                    raise RuntimeError(f"Session store lost entries for a {size}-message history")
+            results[f"mood_df.{size}.cold_ms"] = metric(statistics.median(cold) * 1000, "ms")
+            results[f"mood_df.{size}.warm_ms"] = metric(statistics.median(warm) * 1000, "ms")
+    return results
+
+
+def bench_app_rerun(args):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("Skipping app_rerun: streamlit is not installed")
+        return {}
+
+    app = AppTest.from_file(os.path.join(REPO_DIRECTORY, "app.py"), default_timeout=300)
+    first = timed(app.run)
+    if app.exception:
+        print(f"Error running app.py: {app.exception[0].message}")
+        return {}
+    # The first run renders the page before the models are loaded; wait for them, so the
+    # reruns include the chatbot
+    from startup import get_warm_up
+
+    get_warm_up().wait()
+    rerun = median_time(app.run, args.repeat * 3)
+    return {"app_rerun.first_ms": metric(first * 1000, "ms"), "app_rerun.rerun_ms": metric(rerun * 1000, "ms")}
+
+
+def compare(baseline, current, tolerance):
+    """
+    Print every metric next to its baseline value.
+    :return: Names of the metrics that got worse by more than `tolerance` (a fraction)
+    """
+    regressions = []
+    print(f"\n{'metric':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None or not reference["value"]:
+            print(f"{name:<36} {'-':>12} {result['value']:>12.3f}")
+            continue
+        change = result["value"] / reference["value"] - 1
+        worse = -change if result["higher_is_better"] else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<36} {reference['value']:>12.3f} {result['value']:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the results JSON")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging, e.g. 0.2 = 20%%")
+    parser.add_argument("--only", nargs="*", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--messages", type=int, default=5000, help="corpus size for process_message")
+    parser.add_argument("--sentiment-messages", type=int, default=64)
+    parser.add_argument("--mood-sizes", type=int, nargs="*", default=[10, 100, 1000])
+    parser.add_argument("--session-backend", choices=("sqlite", "memory"), default="sqlite",
+                        help="session store the mood_df benchmark reads the history from")
+    parser.add_argument("--models-directory", default=DEFAULT_MODELS_DIRECTORY, help="where the tiny models are kept")
+    parser.add_argument("--real-models", action="store_true", help="use the configured models instead of tiny ones")
+    args = parser.parse_args()
+
+    # Settings are read when the app's modules are imported, so set them up first. Chat
+    # logs and tasks written while benchmarking go to a scratch directory.
+    scratch = tempfile.TemporaryDirectory()
+    os.environ["CAREGIVER_DATA_DIR"] = scratch.name
+    os.environ.setdefault("CAREGIVER_MODEL_CACHE", os.path.join(REPO_DIRECTORY, "data", "models"))
+    if not args.real_models:
+        from tiny_models import build_tiny_models
+
+        generation_model, sentiment_model, embedding_model = build_tiny_models(args.models_directory)
+        os.environ["CAREGIVER_GENERATION_MODEL"] = generation_model
+        os.environ["CAREGIVER_SENTIMENT_MODEL"] = sentiment_model
+        os.environ["CAREGIVER_EMBEDDING_MODEL"] = embedding_model
+
+    from model_registry import EMBEDDING_MODEL, GENERATION_MODEL, SENTIMENT_MODEL
+    from inference_engines import INFERENCE_ENGINE
+
+    results = {}
+    for group in args.only:
+        print(f"Running {group}...")
+        results.update(globals()[f"bench_{group}"](args))
+
+    report = {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "generation_model": GENERATION_MODEL,
+            "sentiment_model": SENTIMENT_MODEL,
+            "embedding_model": EMBEDDING_MODEL,
+            "engine": INFERENCE_ENGINE,
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    for name, result in results.items():
+        print(f"{name:<36} {result['value']:>12.3f} {result['unit']}")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
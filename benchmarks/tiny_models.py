@@ -0,0 +1,96 @@
+"""
+Tiny, randomly initialised stand-ins for the chatbot's models, built offline.
+
+They share the architectures of the real models (GPT-2 for generation, DistilBERT for
+sentiment and as the sentence-encoder) at a fraction of the size, so benchmarks exercise the same code paths without
+downloading anything. Their outputs are meaningless; only timings and plumbing matter.
+    python benchmarks/tiny_models.py [--directory data/tiny_models]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_DIRECTORY  # noqa: E402
+
+TINY_MODELS_DIRECTORY = os.path.join(DATA_DIRECTORY, "tiny_models")
+VOCABULARY_TEXT = (
+    "i feel overwhelmed tired stress medication pill appointment reminder lonely angry frustrated sad cry thank "
+    "help task care caregiver child today was long and the kids had a rough night so barely slept we went to clinic "
+    "again waiting room packed you are doing great assistant conversation between warm gentle empathetic support "
+    "practical action oriented who suggests concrete next steps following is of with medical complexity a"
+)
+
+
+def _tokenizer(special_tokens):
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast
+
+    words = sorted(set(VOCABULARY_TEXT.split()))
+    vocab = {token: i for i, token in enumerate(dict.fromkeys(list(special_tokens.values()) + words))}
+    backend = Tokenizer(models.WordLevel(vocab, unk_token=special_tokens["unk_token"]))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(
+        tokenizer_object=backend, model_input_names=["input_ids", "attention_mask"], **special_tokens
+    )
+
+
+def build_tiny_models(directory=TINY_MODELS_DIRECTORY):
+    """
+    Create the stand-in models under `directory` unless they already exist.
+    :return: (generation model path, sentiment model path, embedding model path)
+    """
+    generation_path = os.path.join(directory, "generation")
+    sentiment_path = os.path.join(directory, "sentiment")
+    embedding_path = os.path.join(directory, "embedding")
+
+    if not os.path.isdir(generation_path):
+        import torch
+        from transformers import GPT2Config, GPT2LMHeadModel
+
+        torch.manual_seed(0)
+        tokenizer = _tokenizer({"unk_token": "<unk>", "eos_token": "<|endoftext|>", "pad_token": "<|endoftext|>"})
+        config = GPT2Config(vocab_size=len(tokenizer), n_positions=256, n_embd=64, n_layer=2, n_head=2,
+                            bos_token_id=tokenizer.eos_token_id, eos_token_id=tokenizer.eos_token_id)
+        GPT2LMHeadModel(config).save_pretrained(generation_path)
+        tokenizer.save_pretrained(generation_path)
+
+    if not os.path.isdir(sentiment_path):
+        import torch
+        from transformers import DistilBertConfig, DistilBertForSequenceClassification
+
+        torch.manual_seed(0)
+        tokenizer = _tokenizer({"unk_token": "[UNK]", "pad_token": "[PAD]", "cls_token": "[CLS]",
+                                "sep_token": "[SEP]", "mask_token": "[MASK]"})
+        config = DistilBertConfig(vocab_size=len(tokenizer), max_position_embeddings=256, dim=64, hidden_dim=128,
+                                  n_layers=2, n_heads=2, id2label={0: "NEGATIVE", 1: "POSITIVE"},
+                                  label2id={"NEGATIVE": 0, "POSITIVE": 1}, pad_token_id=tokenizer.pad_token_id)
+        DistilBertForSequenceClassification(config).save_pretrained(sentiment_path)
+        tokenizer.save_pretrained(sentiment_path)
+
+    if not os.path.isdir(embedding_path):
+        import torch
+        from transformers import DistilBertConfig, DistilBertModel
+
+        torch.manual_seed(0)
+        tokenizer = _tokenizer({"unk_token": "[UNK]", "pad_token": "[PAD]", "cls_token": "[CLS]",
+                                "sep_token": "[SEP]", "mask_token": "[MASK]"})
+        config = DistilBertConfig(vocab_size=len(tokenizer), max_position_embeddings=256, dim=64, hidden_dim=128,
+                                  n_layers=2, n_heads=2, pad_token_id=tokenizer.pad_token_id)
+        DistilBertModel(config).save_pretrained(embedding_path)
+        tokenizer.save_pretrained(embedding_path)
+
+    return generation_path, sentiment_path, embedding_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--directory", default=TINY_MODELS_DIRECTORY)
+    args = parser.parse_args()
+    for path in build_tiny_models(args.directory):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,120 @@
-from transformers import pipeline
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import hashlib
+import threading
+from collections import OrderedDict
+
+from generation import DEFAULT_MAX_NEW_TOKENS, build_prompt, stream_generate
+from intent_classifier import get_intent_classifier
+from intents import RESOURCE_QUERIES, reply_for
+from language import get_language_service, get_reply_translator
+from model_registry import get_model_registry
+from resource_index import get_resource_index
+from telemetry import get_telemetry
+
+NEUTRAL_SENTIMENT = {"label": "NEUTRAL", "score": 0.0}
+
+
+class SentimentCache:
+    """
+    Thread-safe LRU cache of sentiment results keyed by a hash of the message text,
+    shared by every chatbot in the process so a message is only scored once.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_name, message):
+        return model_name, hashlib.sha1(message.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+    def collect_metrics(self):
+        """
+        Telemetry collector reporting the cache's hit and miss counts.
+        """
+        return [
+            ("caregiver_sentiment_cache_total", {"result": "hit"}, self.hits),
+            ("caregiver_sentiment_cache_total", {"result": "miss"}, self.misses),
+        ]
+
+
+sentiment_cache = SentimentCache()
+get_telemetry().add_collector(sentiment_cache.collect_metrics)
+
+
+def detect_language(text, default="en"):
+    """
+    Detect the language of a message
+    :param text: Input message text
+    :param default: Language assumed for short or ASCII-only messages, and if detection fails
+    :return: ISO 639-1 language code
+    """
+    return get_language_service().detect(text, default)
+
 
 class CaregiverChatbot:
-    def __init__(self, language="en", device=-1, tone="soft"):
+    def __init__(self, language="en", device=-1, tone="soft", registry=None, intent_matcher=None,
+                 batch_sentiment=True, generative=False, max_new_tokens=DEFAULT_MAX_NEW_TOKENS,
+                 task_store=None, user_id=None, translator=None, resource_index=None):
         self.language = language
         self.device = device
         self.tone = tone
+        # Route sentiment requests through the registry's shared micro-batcher, so concurrent
+        # sessions share pipeline calls instead of each scoring one message at a time
+        self.batch_sentiment = batch_sentiment
+        # In generative mode, messages that match no intent get a reply generated by the model
+        # instead of the fallback reply; known intents keep their canned reply
+        self.generative = generative
+        self.max_new_tokens = max_new_tokens
+        self.last_generation_stats = None
+        # Intent matched by the last processed message, None if it matched none
+        self.last_intent = None
+        # When given, questions about care tasks are answered from the user's task store
+        self.task_store = task_store
+        self.user_id = user_id
+        # Canned replies are localised to `language` from the precomputed catalog
+        self.translator = translator or get_reply_translator()
+        # Index the resource suggestions are drawn from; the process-wide catalog by default
+        self.resource_index = resource_index
 
-        # Initialize the model and tokenizer
-        try:
-            model_name = "gpt2"  # Change to your model's name if needed
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model.to(self.device)
-        except Exception as e:
-            print(f"Error initializing the chatbot: {e}")
+        # Models are loaded once per process by the registry and shared read-only across
+        # sessions, so building a chatbot per Streamlit rerun is cheap.
+        self.registry = registry or get_model_registry(device)
+        # Recognises intents by embedding similarity, or by keywords (see intent_classifier.py)
+        self.intent_matcher = intent_matcher or get_intent_classifier(self.registry)
+
+        # The language model is only used in generative mode, so sentiment-only callers never
+        # wait for it to load
+        self.model = None
+        self.tokenizer = None
+        if generative:
+            try:
+                self.model, self.tokenizer = self.registry.generation()
+            except Exception as e:
+                print(f"Error initializing the chatbot: {e}")
 
         # Initialize sentiment analysis pipeline from HuggingFace
-        self.sentiment_analyzer = pipeline("sentiment-analysis")
+        self.sentiment_analyzer = self.registry.sentiment()
 
     def set_language(self, language):
         """
@@ -25,8 +122,6 @@ class CaregiverChatbot:
         :param language: A string representing the language code (e.g., 'en' for English, 'fr' for French).
         """
         self.language = language
-        print(f"Language set to: {language}")
-        # Additional logic to switch language settings can go here (if required by your model).
 
     def analyze_sentiment(self, message):
         """
@@ -34,15 +129,65 @@ class CaregiverChatbot:
         :param message: Input message text
         :return: sentiment label ('POSITIVE' or 'NEGATIVE') and score (confidence)
         """
-        try:
-            sentiment_result = self.sentiment_analyzer(message)
+        return self.analyze_sentiments([message])[0]
+
+    def analyze_sentiments(self, messages):
+        """
+        Analyze sentiment of several messages, scoring only those not already cached.
+        Uncached messages go through the shared micro-batcher, or through one pipeline call
+        when batching is disabled
+        :param messages: List of input message texts
+        :return: List of {"label", "score"} dicts, in the same order as the messages
+        """
+        # Engines score slightly differently, so their results are cached apart
+        model_name = (self.registry.sentiment_model, self.registry.engine)
+        keys = [SentimentCache.key(model_name, message) for message in messages]
+        results = [sentiment_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return [dict(result) for result in results]
+
+        pending = [messages[i] for i in missing]
+        if self.batch_sentiment:
+            futures = self.registry.sentiment_batcher().submit_many(pending)
+            sentiment_results = [self._wait_for_sentiment(future) for future in futures]
+        else:
+            sentiment_results = self._run_sentiment_pipeline(pending)
+
+        for i, sentiment_result in zip(missing, sentiment_results):
+            if not sentiment_result:
+                results[i] = NEUTRAL_SENTIMENT  # Return neutral in case of error
+                continue
             # Ensure the result is consistent and return it in a structured way
-            sentiment = sentiment_result[0]['label'] if sentiment_result else "NEUTRAL"
-            score = sentiment_result[0]['score'] if sentiment_result else 0.0
-            return {"label": sentiment, "score": score}
+            results[i] = {"label": sentiment_result['label'], "score": sentiment_result['score']}
+            sentiment_cache.put(keys[i], results[i])
+        return [dict(result) for result in results]
+
+    def _run_sentiment_pipeline(self, messages):
+        try:
+            return self.sentiment_analyzer(messages, batch_size=len(messages), truncation=True)
         except Exception as e:
+            if len(messages) > 1:
+                # Score the messages one at a time, so only the failing one comes back neutral
+                return [result for message in messages for result in self._run_sentiment_pipeline([message])]
             print(f"Error in sentiment analysis: {e}")
-            return {"label": "NEUTRAL", "score": 0.0}  # Return neutral in case of error
+            return [None]
+
+    @staticmethod
+    def _wait_for_sentiment(future):
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Error in sentiment analysis: {e}")
+            return None
+
+    def match_intent(self, message):
+        """
+        Find the intent a message expresses with the intent classifier
+        :param message: Input message text
+        :return: The matched Intent, or None if the message expresses none
+        """
+        return self.intent_matcher.match(message)
 
     def process_message(self, message):
         """
@@ -50,48 +195,86 @@ class CaregiverChatbot:
         :param message: Input message text
         :return: Response based on the tone
         """
-        message = message.lower()
-
-        if self.tone == "soft":
-            if "overwhelmed" in message or "tired" in message or "stress" in message:
-                return "😔 Hmm... that sounds really tough. Caregiving can be so exhausting sometimes. You're doing your best, and that's more than enough. I'm here for you 💛"
-            elif "medication" in message or "pill" in message:
-                return "💊 Got it. Medication can be tricky, right? Do you need help keeping track of doses or timing? I'm here to help you sort it out 👍"
-            elif "appointment" in message or "reminder" in message:
-                return "📅 Of course! I can help with that. Would you like me to set up a gentle reminder for upcoming appointments? 😊"
-            elif "lonely" in message:
-                return "💙 Ouch... loneliness is hard. Just know you’re not alone right now. I'm right here with you. Want to talk a little more? 🫂"
-            elif "angry" in message or "frustrated" in message:
-                return "😤 Ugh, I get that. It’s completely okay to feel frustrated. Want to vent a bit? I’m here to listen."
-            elif "sad" in message or "cry" in message:
-                return "😭 I’m so sorry you’re feeling this way. It’s okay to cry—it means you care deeply. Sending you a big virtual hug 🤗"
-            elif "thank" in message:
-                return "😊 Aww, you're very welcome! I'm really glad I could help 💖"
-            elif "help" in message:
-                return "🤝 Sure thing! Just tell me what you need and I’ll do my best to be useful."
-            elif "task" in message or "what are my care tasks" in message or "show tasks" in message:
-                return "📋 Here are your scheduled care tasks. Please check the section below."
-            else:
-                return "🫶 You're doing great, seriously. Being a caregiver isn’t easy. How else can I support you today?"
-
-        elif self.tone == "directive":
-            if "overwhelmed" in message or "tired" in message or "stress" in message:
-                return "💡 Let's take a breath. Start by listing your top 3 priorities. Together, we can find a way to manage this better."
-            elif "medication" in message or "pill" in message:
-                return "📋 Let’s make a simple schedule for medication tracking. Do you want a reminder every day or just weekly?"
-            elif "appointment" in message or "reminder" in message:
-                return "✅ Let’s organize your upcoming appointments. You can create a digital note or calendar entry — I’ll guide you if needed."
-            elif "lonely" in message:
-                return "🤝 Feeling lonely is valid. I suggest reaching out to a support group or friend. Would you like a resource link?"
-            elif "angry" in message or "frustrated" in message:
-                return "⚠️ Anger is a signal. Let’s channel that into action — maybe write down what triggered it and how to prevent it."
-            elif "sad" in message or "cry" in message:
-                return "📘 When sadness hits, journaling or a short walk can help. Want me to suggest a reflection prompt?"
-            elif "thank" in message:
-                return "✅ I’m always ready to assist. Let’s keep going strong!"
-            elif "help" in message:
-                return "🚀 Just let me know what task or challenge you're dealing with — and we’ll tackle it step by step."
-            elif "task" in message or "what are my care tasks" in message or "show tasks" in message:
-                return "📋 Here are your scheduled care tasks. Please check the section below."
-            else:
-                return "🛠️ What would you like to work on next? You’ve got this — and I’ve got your back."
+        if self.generative:
+            return "".join(self.stream_reply(message)).strip()
+        self.last_intent = self.match_intent(message)
+        return self._canned_reply(self.last_intent)
+
+    def _canned_reply(self, intent):
+        if intent is not None and intent.name == "tasks" and self.task_store is not None and self.user_id:
+            return self._tasks_reply()
+        return self.translator.localize(
+            reply_for(intent, self.tone), self.tone, intent.name if intent else None, self.language
+        )
+
+    def _tasks_reply(self, count=3):
+        """
+        List the user's next few tasks and how many are overdue.
+        """
+        upcoming = self.task_store.next_due(self.user_id, n=count)
+        overdue = self.task_store.count_overdue(self.user_id)
+        lines = [f"- **{task['type']}** — {task['name']} at {task['time']} on {task['date']}" for task in upcoming]
+        if upcoming:
+            reply = "📋 Here are your next care tasks:\n" + "\n".join(lines)
+        else:
+            reply = "📋 You have no upcoming care tasks. You can add some from the sidebar."
+        if overdue:
+            reply += f"\n\n⏰ {overdue} task(s) are overdue."
+        return reply
+
+    def suggest_resources(self, message, k=3):
+        """
+        Suggest resources for the intent a message expresses, preferring the chatbot's language
+        :param k: Maximum number of suggestions
+        :return: List of resource dicts, empty if the intent has no resource query
+        """
+        intent = self.match_intent(message)
+        query = RESOURCE_QUERIES.get(intent.name) if intent else None
+        if not query:
+            return []
+        index = self.resource_index or get_resource_index()
+        results, _ = index.search(query, k=k, language=self.language)
+        if not results and self.language != "en":
+            results, _ = index.search(query, k=k)
+        return results
+
+    def stream_reply(self, message):
+        """
+        Yield the reply to a message piece by piece as it is produced.
+        Known intents yield their canned reply at once; in generative mode other messages
+        stream from the language model, and their time-to-first-token and tokens/sec are
+        recorded in `last_generation_stats`.
+        :param message: Input message text
+        """
+        intent = self.last_intent = self.match_intent(message)
+        if intent is not None or not self.generative or self.model is None:
+            yield self._canned_reply(intent)
+            return
+
+        stats = {}
+        produced = False
+        try:
+            for text in stream_generate(
+                self.model, self.tokenizer, build_prompt(message, self.tone),
+                device=self.device, max_new_tokens=self.max_new_tokens, stats=stats,
+            ):
+                produced = True
+                yield text
+        except Exception as e:
+            print(f"Error generating a reply: {e}")
+        self.last_generation_stats = stats or None
+        if not produced:
+            yield self._canned_reply(None)
+
+    def process_messages(self, messages):
+        """
+        Process a batch of messages, e.g. when replaying a transcript archive
+        :param messages: Iterable of input message texts
+        :return: List of responses, in the same order as the messages
+        """
+        messages = list(messages)
+        if self.generative:
+            return [self.process_message(message) for message in messages]
+        # Canned replies only need the intents, classified in one batch
+        return [self._canned_reply(intent)
+                for intent in self.intent_matcher.match_many(messages)]
@@ -0,0 +1,11 @@
+"""
+Settings shared by several modules.
+
+Each file the app writes (task and session databases, model exports, profiles) lives under
+DATA_DIRECTORY unless its own environment variable points elsewhere.
+"""
+import os
+
+DATA_DIRECTORY = os.environ.get(
+    "CAREGIVER_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
@@ -0,0 +1,91 @@
+import threading
+import time
+
+from inference_engines import torch_device
+
+# Prompts conditioning the generative model on the chatbot's tone
+TONE_PROMPTS = {
+    "soft": (
+        "The following is a conversation between a caregiver of a child with medical complexity "
+        "and a warm, gentle and empathetic support assistant.\n"
+    ),
+    "directive": (
+        "The following is a conversation between a caregiver of a child with medical complexity "
+        "and a practical, action-oriented support assistant who suggests concrete next steps.\n"
+    ),
+}
+
+DEFAULT_MAX_NEW_TOKENS = 60
+
+
+def build_prompt(message, tone):
+    return f"{TONE_PROMPTS.get(tone, TONE_PROMPTS['soft'])}Caregiver: {message.strip()}\nAssistant:"
+
+
+def stream_generate(model, tokenizer, prompt, device=-1, max_new_tokens=DEFAULT_MAX_NEW_TOKENS, stats=None):
+    """
+    Generate a reply to `prompt` and yield its text as the model produces it.
+
+    Generation runs in a background thread with the KV cache enabled, and stops at the end
+    of the assistant's turn (the first newline) or after `max_new_tokens` tokens.
+    :param stats: Optional dict filled in with "ttft_seconds", "new_tokens" and
+                  "tokens_per_second" once the reply is complete
+    """
+    from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+    turn_finished = threading.Event()
+
+    class StopAtEndOfTurn(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return turn_finished.is_set()
+
+    inputs = tokenizer(prompt, return_tensors="pt", return_token_type_ids=False).to(torch_device(device))
+    prompt_length = inputs["input_ids"].shape[-1]
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    output = {}
+
+    def generate():
+        try:
+            output["ids"] = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                use_cache=True,
+                do_sample=True,
+                top_p=0.9,
+                temperature=0.7,
+                pad_token_id=tokenizer.eos_token_id,
+                streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([StopAtEndOfTurn()]),
+            )
+        except Exception as e:
+            output["error"] = e
+            streamer.end()
+
+    started = time.perf_counter()
+    first_token_at = None
+    worker = threading.Thread(target=generate, name="reply-generation", daemon=True)
+    worker.start()
+    try:
+        for text in streamer:
+            if turn_finished.is_set() or not text:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                text = text.lstrip()
+            if "\n" in text:
+                text = text.split("\n", 1)[0]
+                turn_finished.set()
+            if text:
+                yield text
+    finally:
+        turn_finished.set()
+        worker.join()
+
+    if "error" in output:
+        raise output["error"]
+    if stats is not None:
+        elapsed = time.perf_counter() - started
+        new_tokens = output["ids"].shape[-1] - prompt_length
+        stats["ttft_seconds"] = (first_token_at or time.perf_counter()) - started
+        stats["new_tokens"] = int(new_tokens)
+        stats["tokens_per_second"] = new_tokens / elapsed if elapsed > 0 else 0.0
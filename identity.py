@@ -0,0 +1,108 @@
+"""
+Server-issued user identities.
+
+Care tasks and the session state are stored per user id. Ids are random and created by
+the server, which hands them out as "<user id>.<signature>" tokens signed with HMAC-SHA256,
+so a client can only present an id the server issued. The app keeps the token in a
+cookie and API clients send it as a bearer token; it never appears in a URL.
+
+Tokens are signed with CAREGIVER_SECRET_KEY; give every replica the same one. When it is
+unset, a key is generated on first use and kept in the data directory.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import uuid
+
+from config import DATA_DIRECTORY
+
+SECRET_KEY_PATH = os.environ.get("CAREGIVER_SECRET_KEY_FILE", os.path.join(DATA_DIRECTORY, "secret_key"))
+USER_COOKIE = "caregiver_user"
+USER_COOKIE_MAX_AGE = 365 * 24 * 3600
+
+_secret_key = None
+_secret_key_lock = threading.Lock()
+
+
+def get_secret_key():
+    """
+    Return the key user tokens are signed with.
+    """
+    global _secret_key
+    configured = os.environ.get("CAREGIVER_SECRET_KEY")
+    if configured:
+        return configured.encode("utf-8")
+    with _secret_key_lock:
+        if _secret_key is None:
+            os.makedirs(os.path.dirname(SECRET_KEY_PATH) or ".", exist_ok=True)
+            try:
+                # Created readable by this user only; the first process to start writes it
+                fd = os.open(SECRET_KEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                with open(SECRET_KEY_PATH, encoding="utf-8") as f:
+                    _secret_key = f.read().strip().encode("utf-8")
+            else:
+                key = secrets.token_hex(32)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(key)
+                _secret_key = key.encode("utf-8")
+        return _secret_key
+
+
+def _signature(user_id):
+    return hmac.new(get_secret_key(), user_id.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def new_user():
+    """
+    Create a user id.
+    :return: (user id, token to give the client)
+    """
+    user_id = uuid.uuid4().hex
+    return user_id, issue_token(user_id)
+
+
+def issue_token(user_id):
+    return f"{user_id}.{_signature(user_id)}"
+
+
+def verify_token(token):
+    """
+    Return the user id a token was issued for, or None if it is missing or not signed by
+    this server.
+    """
+    if not isinstance(token, str):
+        return None
+    user_id, _, signature = token.rpartition(".")
+    if user_id and hmac.compare_digest(signature, _signature(user_id)):
+        return user_id
+    return None
+
+
+def get_streamlit_user_id():
+    """
+    Return the user id of the current Streamlit session: the one in the browser's signed
+    cookie, or a new one whose cookie is then set, so a reload or another replica finds the
+    same user again.
+    """
+    import streamlit as st
+    import streamlit.components.v1 as components
+
+    # Cookies are those sent when the page connected, so they stay the same for the session
+    user_id = verify_token(st.context.cookies.get(USER_COOKIE))
+    if user_id is not None:
+        return user_id
+    if "user_id" not in st.session_state:
+        st.session_state.user_id, st.session_state.user_token = new_user()
+    # Rendered on every full rerun until the page is reloaded with the cookie, so it stays
+    # mounted and sets the cookie once
+    components.html(f"""
+    <script>
+      const secure = window.parent.location.protocol === "https:" ? "; Secure" : "";
+      window.parent.document.cookie = "{USER_COOKIE}={st.session_state.user_token}; Max-Age={USER_COOKIE_MAX_AGE}"
+        + "; Path=/; SameSite=Strict" + secure;
+    </script>
+    """, height=0)
+    return st.session_state.user_id
@@ -0,0 +1,188 @@
+"""
+Inference engines the chatbot's models can run on.
+
+- "torch": the PyTorch fp32 models as published (default)
+- "int8": PyTorch with the linear layers dynamically quantised to int8 (CPU only)
+- "onnx": the models exported to ONNX and run with ONNX Runtime through optimum (CPU only).
+  Exports are cached under MODEL_CACHE_DIRECTORY, so only the first start pays for the
+  conversion; delete a model's directory there to export it again.
+
+Pick one with the CAREGIVER_INFERENCE_ENGINE environment variable, and compare them with
+    python benchmarks/parity_engines.py
+"""
+import os
+import re
+import shutil
+import tempfile
+
+from config import DATA_DIRECTORY
+
+ENGINES = ("torch", "int8", "onnx")
+INFERENCE_ENGINE = os.environ.get("CAREGIVER_INFERENCE_ENGINE", "torch")
+MODEL_CACHE_DIRECTORY = os.environ.get("CAREGIVER_MODEL_CACHE", os.path.join(DATA_DIRECTORY, "models"))
+# Device index for the models (-1 for CPU); detected from PyTorch when unset
+DEVICE = os.environ.get("CAREGIVER_DEVICE")
+
+
+def default_device():
+    """
+    Return DEVICE if set, else 0 (the first CUDA device) when PyTorch can use one and -1
+    (CPU) otherwise. Imports torch, which takes seconds, so keep it off the first paint.
+    """
+    if DEVICE is not None:
+        return int(DEVICE)
+    import torch
+
+    return 0 if torch.cuda.is_available() else -1
+
+
+def torch_device(device):
+    """
+    Translate the pipeline-style device index (-1 for CPU, >=0 for a CUDA ordinal)
+    into something `torch.nn.Module.to` accepts.
+    """
+    if isinstance(device, int):
+        return "cpu" if device < 0 else f"cuda:{device}"
+    return device
+
+
+def resolve_engine(engine, device):
+    """
+    Validate an engine name for a device. The int8 and ONNX engines only run on CPU, so a
+    GPU device keeps the PyTorch engine.
+    :raises ValueError: For an unknown engine name
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown inference engine {engine!r}; choose one of: {', '.join(ENGINES)}")
+    if engine != "torch" and torch_device(device) != "cpu":
+        print(f"Error: the {engine} engine runs on CPU only, using torch on {torch_device(device)}")
+        return "torch"
+    return engine
+
+
+def export_directory(model_name, task):
+    """
+    Return the directory the ONNX export of a model is cached in.
+    """
+    return os.path.join(MODEL_CACHE_DIRECTORY, "onnx", task, re.sub(r"[^\w.-]+", "--", model_name).strip("-"))
+
+
+def _load_onnx(model_class, model_name, task, **export_options):
+    """
+    Load the cached ONNX export of a model, exporting and caching it on first use. The
+    export is written to a temporary directory and moved into place, so an interrupted
+    export is never mistaken for a complete one.
+    """
+    directory = export_directory(model_name, task)
+    if os.path.isdir(directory):
+        return model_class.from_pretrained(directory)
+
+    model = model_class.from_pretrained(model_name, export=True, **export_options)
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    staging = tempfile.mkdtemp(dir=os.path.dirname(directory))
+    try:
+        model.save_pretrained(staging)
+        os.replace(staging, directory)
+    except OSError as e:
+        print(f"Error caching the ONNX export of {model_name}: {e}")
+        shutil.rmtree(staging, ignore_errors=True)
+    return model
+
+
+def _conv1d_to_linear(model):
+    """
+    Replace GPT-2 style Conv1D layers (a transposed linear layer) with torch.nn.Linear, so
+    dynamic quantisation, which only knows nn.Linear, applies to them.
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(module, name, linear)
+    return model
+
+
+def quantize_int8(model):
+    """
+    Return `model` with its linear layers dynamically quantised to int8: weights are stored
+    as int8 and activations are quantised on the fly, on CPU.
+    """
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(_conv1d_to_linear(model), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_generation(model_name, engine="torch", device=-1):
+    """
+    Load the text-generation model and its tokenizer on an engine.
+    :return: (model, tokenizer); the model supports `generate` whatever the engine
+    """
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if engine == "onnx":
+        from optimum.onnxruntime import ORTModelForCausalLM
+
+        return _load_onnx(ORTModelForCausalLM, model_name, "text-generation", use_cache=True), tokenizer
+
+    from transformers import AutoModelForCausalLM
+
+    model = AutoModelForCausalLM.from_pretrained(model_name)
+    model.to(torch_device(device))
+    model.eval()
+    if engine == "int8":
+        model = quantize_int8(model)
+    return model, tokenizer
+
+
+def load_sentiment(model_name, engine="torch", device=-1):
+    """
+    Load the sentiment-analysis pipeline on an engine.
+    """
+    from transformers import pipeline
+
+    if engine == "torch":
+        return pipeline("sentiment-analysis", model=model_name, device=device)
+
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if engine == "onnx":
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+
+        model = _load_onnx(ORTModelForSequenceClassification, model_name, "text-classification")
+    else:
+        from transformers import AutoModelForSequenceClassification
+
+        model = quantize_int8(AutoModelForSequenceClassification.from_pretrained(model_name).eval())
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+
+def load_embedding(model_name, engine="torch", device=-1):
+    """
+    Load a sentence-encoder (a plain transformer whose token states are mean-pooled) on an
+    engine.
+    :return: (model, tokenizer); the model returns `last_hidden_state` whatever the engine
+    """
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if engine == "onnx":
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+
+        return _load_onnx(ORTModelForFeatureExtraction, model_name, "feature-extraction"), tokenizer
+
+    from transformers import AutoModel
+
+    model = AutoModel.from_pretrained(model_name)
+    model.to(torch_device(device))
+    model.eval()
+    if engine == "int8":
+        model = quantize_int8(model)
+    return model, tokenizer
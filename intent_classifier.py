@@ -0,0 +1,208 @@
+"""
+Embedding-based intent classifier for messages in any of the app's languages.
+
+The keyword rules decide first, as before. Messages they match no intent in, such as
+paraphrases or other languages, are embedded with a small multilingual sentence-encoder
+(mean-pooled token states, L2-normalised) and compared with every intent example in
+INTENT_EXEMPLARS in one matrix product; the intent of the most similar example wins when
+its cosine similarity reaches the threshold. The examples' embedding matrix is computed once per encoder and cached as a .npy file, memory-mapped on
+later starts.
+
+Pick the classifier with CAREGIVER_INTENT_CLASSIFIER ("embedding" or "keywords").
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from inference_engines import MODEL_CACHE_DIRECTORY
+from intents import DEFAULT_MATCHER, INTENT_EXEMPLARS, INTENTS
+from telemetry import get_telemetry
+
+INTENT_CLASSIFIERS = ("embedding", "keywords")
+INTENT_CLASSIFIER = os.environ.get("CAREGIVER_INTENT_CLASSIFIER", "embedding")
+# Minimum cosine similarity with an intent example for the embedding to decide the intent
+INTENT_THRESHOLD = float(os.environ.get("CAREGIVER_INTENT_THRESHOLD", "0.55"))
+EXEMPLAR_CACHE_DIRECTORY = os.path.join(MODEL_CACHE_DIRECTORY, "intent_exemplars")
+EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_MAX_LENGTH = 128
+
+
+class EmbeddingIntentClassifier:
+    """
+    Matches messages to intents with the keyword matcher, and by sentence-embedding
+    similarity when no keyword matches. Has the same match/match_many interface as IntentMatcher.
+    """
+
+    def __init__(self, registry, intents=INTENTS, exemplars=INTENT_EXEMPLARS, threshold=INTENT_THRESHOLD,
+                 fallback=DEFAULT_MATCHER, cache_directory=EXEMPLAR_CACHE_DIRECTORY, cache_size=4096):
+        """
+        :param registry: ModelRegistry providing the sentence-encoder
+        :param exemplars: {intent name: example messages}
+        :param threshold: Minimum cosine similarity for the embedding to decide the intent
+        :param fallback: Matcher deciding when no example is similar enough, or when the
+                         encoder cannot be loaded
+        """
+        self.registry = registry
+        self.threshold = threshold
+        self.fallback = fallback
+        self.cache_directory = cache_directory
+        intents_by_name = {intent.name: intent for intent in intents}
+        self.intents = [intents_by_name[name] for name in exemplars if name in intents_by_name]
+        self._texts = [text for intent in self.intents for text in exemplars[intent.name]]
+        # First row of each intent's examples in the matrix, for a per-intent max in one call
+        counts = [len(exemplars[intent.name]) for intent in self.intents]
+        self._starts = np.cumsum([0] + counts[:-1])
+        self._matrix = None
+        self._failed = False
+        self._lock = threading.Lock()
+        self._warm_up_thread = None
+        self._match_cached = lru_cache(maxsize=cache_size)(self._match_uncached)
+
+    def embed(self, messages):
+        """
+        Embed messages, EMBEDDING_BATCH_SIZE per encoder call.
+        :return: float32 array of shape (len(messages), dimensions), rows of unit length
+        """
+        import torch
+
+        model, tokenizer = self.registry.embedding()
+        vectors = []
+        for start in range(0, len(messages), EMBEDDING_BATCH_SIZE):
+            inputs = tokenizer(list(messages[start:start + EMBEDDING_BATCH_SIZE]), padding=True, truncation=True,
+                               max_length=EMBEDDING_MAX_LENGTH, return_tensors="pt").to(model.device)
+            with torch.inference_mode():
+                hidden = model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            vectors.append(torch.nn.functional.normalize(pooled, dim=-1).float().cpu().numpy())
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(vectors)
+
+    def cache_path(self):
+        """
+        Return the file the example matrix is cached in. Its name covers the encoder, the
+        engine and the examples, so changing any of them builds a new matrix.
+        """
+        digest = hashlib.sha1("\n".join([self.registry.embedding_model, *self._texts]).encode("utf-8")).hexdigest()
+        name = re.sub(r"[^\w.-]+", "--", self.registry.embedding_model).strip("-")
+        return os.path.join(self.cache_directory, f"{name}-{self.registry.engine}-{digest[:16]}.npy")
+
+    def exemplar_matrix(self):
+        """
+        Return the (examples, dimensions) matrix of example embeddings, loading it from the
+        cache (memory-mapped) or computing and caching it on first use.
+        """
+        if self._matrix is not None:
+            return self._matrix
+        with self._lock:
+            if self._matrix is None:
+                path = self.cache_path()
+                if os.path.exists(path):
+                    self._matrix = np.load(path, mmap_mode="r")
+                else:
+                    self._matrix = self._build_matrix(path)
+            return self._matrix
+
+    def _build_matrix(self, path):
+        matrix = self.embed(self._texts)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".npy", delete=False) as f:
+                np.save(f, matrix)
+            os.replace(f.name, path)
+        except OSError as e:
+            print(f"Error caching the intent examples: {e}")
+        return matrix
+
+    def warm_up(self, background=False):
+        """
+        Load the encoder and the example matrix, which otherwise happens on the first message.
+        """
+        if background:
+            with self._lock:
+                if self._warm_up_thread is None:
+                    self._warm_up_thread = threading.Thread(target=self.warm_up, name="intent-classifier-warm-up",
+                                                            daemon=True)
+                    self._warm_up_thread.start()
+            return
+        self.match_many(["warm up"])
+
+    def match(self, message):
+        """
+        Return the intent `message` expresses, or None.
+        :param message: Message text as typed; the encoder is case-sensitive
+        """
+        return self._match_cached(message)
+
+    def _match_uncached(self, message):
+        return self.match_many([message])[0]
+
+    def match_many(self, messages):
+        """
+        Classify several messages: the keywords first, then the messages they leave unmatched
+        with one encoder pass per batch and one similarity matrix product.
+        :return: List of intents (or None), in the same order as the messages
+        """
+        if not messages:
+            return []
+        # An exact keyword match wins: the threshold is not tuned well enough for the
+        # embedding to overrule it
+        results = self.fallback.match_many(messages)
+        unmatched = [i for i, intent in enumerate(results) if intent is None]
+        scores = None
+        if unmatched and not self._failed:
+            try:
+                self.registry.embedding()
+                matrix = self.exemplar_matrix()
+            except Exception as e:
+                # Without the encoder (e.g. offline on first start), the keywords decide from now on
+                print(f"Error loading the intent classifier, using keywords only: {e}")
+                self._failed = True
+            else:
+                try:
+                    scores = self.embed([messages[i] for i in unmatched]) @ matrix.T
+                except Exception as e:
+                    print(f"Error classifying intents, using keywords for these messages: {e}")
+
+        embedded = 0
+        if scores is not None:
+            # Best similarity per intent, then the best intent per message
+            per_intent = np.maximum.reduceat(scores, self._starts, axis=1)
+            best = per_intent.argmax(axis=1)
+            confident = per_intent[np.arange(len(unmatched)), best] >= self.threshold
+            for i, index, ok in zip(unmatched, best, confident):
+                if ok:
+                    results[i] = self.intents[index]
+            embedded = int(confident.sum())
+        telemetry = get_telemetry()
+        telemetry.increment("caregiver_intent_classifications_total", embedded, method="embedding")
+        telemetry.increment("caregiver_intent_classifications_total", len(messages) - embedded, method="keywords")
+        return results
+
+
+_classifiers = {}
+_classifiers_lock = threading.Lock()
+
+
+def get_intent_classifier(registry, kind=INTENT_CLASSIFIER):
+    """
+    Return the process-wide intent classifier for a model registry: the embedding
+    classifier, or the keyword matcher when `kind` is "keywords".
+    :raises ValueError: For an unknown classifier name
+    """
+    if kind not in INTENT_CLASSIFIERS:
+        raise ValueError(f"Unknown intent classifier {kind!r}; choose one of: {', '.join(INTENT_CLASSIFIERS)}")
+    if kind == "keywords":
+        return DEFAULT_MATCHER
+    key = (registry.embedding_model, registry.device, registry.engine)
+    with _classifiers_lock:
+        classifier = _classifiers.get(key)
+        if classifier is None:
+            classifier = _classifiers[key] = EmbeddingIntentClassifier(registry)
+        return classifier
@@ -0,0 +1,255 @@
+import re
+from collections import namedtuple
+
+# An intent is recognised when any of its keywords occurs in the lowercased message.
+Intent = namedtuple("Intent", ["name", "keywords", "replies"])
+
+# Intents in priority order: when a message contains keywords of several intents,
+# the one listed first wins.
+INTENTS = (
+    Intent(
+        "stress",
+        ("overwhelmed", "tired", "stress"),
+        {
+            "soft": "😔 Hmm... that sounds really tough. Caregiving can be so exhausting sometimes. You're doing your best, and that's more than enough. I'm here for you 💛",
+            "directive": "💡 Let's take a breath. Start by listing your top 3 priorities. Together, we can find a way to manage this better.",
+        },
+    ),
+    Intent(
+        "medication",
+        ("medication", "pill"),
+        {
+            "soft": "💊 Got it. Medication can be tricky, right? Do you need help keeping track of doses or timing? I'm here to help you sort it out 👍",
+            "directive": "📋 Let’s make a simple schedule for medication tracking. Do you want a reminder every day or just weekly?",
+        },
+    ),
+    Intent(
+        "appointment",
+        ("appointment", "reminder"),
+        {
+            "soft": "📅 Of course! I can help with that. Would you like me to set up a gentle reminder for upcoming appointments? 😊",
+            "directive": "✅ Let’s organize your upcoming appointments. You can create a digital note or calendar entry — I’ll guide you if needed.",
+        },
+    ),
+    Intent(
+        "lonely",
+        ("lonely",),
+        {
+            "soft": "💙 Ouch... loneliness is hard. Just know you’re not alone right now. I'm right here with you. Want to talk a little more? 🫂",
+            "directive": "🤝 Feeling lonely is valid. I suggest reaching out to a support group or friend. Would you like a resource link?",
+        },
+    ),
+    Intent(
+        "angry",
+        ("angry", "frustrated"),
+        {
+            "soft": "😤 Ugh, I get that. It’s completely okay to feel frustrated. Want to vent a bit? I’m here to listen.",
+            "directive": "⚠️ Anger is a signal. Let’s channel that into action — maybe write down what triggered it and how to prevent it.",
+        },
+    ),
+    Intent(
+        "sad",
+        ("sad", "cry"),
+        {
+            "soft": "😭 I’m so sorry you’re feeling this way. It’s okay to cry—it means you care deeply. Sending you a big virtual hug 🤗",
+            "directive": "📘 When sadness hits, journaling or a short walk can help. Want me to suggest a reflection prompt?",
+        },
+    ),
+    Intent(
+        "thanks",
+        ("thank",),
+        {
+            "soft": "😊 Aww, you're very welcome! I'm really glad I could help 💖",
+            "directive": "✅ I’m always ready to assist. Let’s keep going strong!",
+        },
+    ),
+    Intent(
+        "help",
+        ("help",),
+        {
+            "soft": "🤝 Sure thing! Just tell me what you need and I’ll do my best to be useful.",
+            "directive": "🚀 Just let me know what task or challenge you're dealing with — and we’ll tackle it step by step.",
+        },
+    ),
+    Intent(
+        "tasks",
+        ("task", "what are my care tasks", "show tasks"),
+        {
+            "soft": "📋 Here are your scheduled care tasks. Please check the section below.",
+            "directive": "📋 Here are your scheduled care tasks. Please check the section below.",
+        },
+    ),
+)
+
+# Replies used when no intent matches
+FALLBACK_REPLIES = {
+    "soft": "🫶 You're doing great, seriously. Being a caregiver isn’t easy. How else can I support you today?",
+    "directive": "🛠️ What would you like to work on next? You’ve got this — and I’ve got your back.",
+}
+
+# Example messages per intent for the embedding classifier (intent_classifier.py). The
+# encoder is multilingual, so English examples also cover messages in the app's other
+# languages; paraphrases matter more than keywords here.
+INTENT_EXEMPLARS = {
+    "stress": (
+        "I feel overwhelmed",
+        "I'm so tired all the time",
+        "I can't keep up with everything",
+        "I'm exhausted and stressed out",
+        "It's all too much for me",
+        "I haven't slept properly in weeks",
+        "I'm burning out",
+    ),
+    "medication": (
+        "I need help with medication",
+        "She won't take her meds",
+        "I keep forgetting which pill is due",
+        "How do I manage his prescriptions?",
+        "He refuses his medicine",
+        "The doses are confusing",
+    ),
+    "appointment": (
+        "Help me manage appointments",
+        "Remind me about the doctor visit",
+        "We have a hospital check-up next week",
+        "I need to book a visit with the specialist",
+        "Can you set a reminder for the clinic?",
+    ),
+    "lonely": (
+        "I feel lonely",
+        "Nobody understands what we go through",
+        "I feel so isolated",
+        "I have no one to talk to",
+        "I miss having friends around",
+    ),
+    "angry": (
+        "I'm angry",
+        "I'm so frustrated with the hospital",
+        "This makes me furious",
+        "I'm fed up with the insurance company",
+        "I keep snapping at everyone",
+    ),
+    "sad": (
+        "I feel sad",
+        "I can't stop crying",
+        "I feel down and hopeless",
+        "I'm heartbroken about his diagnosis",
+        "Everything feels so gloomy",
+    ),
+    "thanks": (
+        "Thank you",
+        "Thanks, that really helped",
+        "I appreciate your help",
+        "That was useful, cheers",
+    ),
+    "help": (
+        "Can you help me?",
+        "I need some support",
+        "What can you do for me?",
+        "I don't know where to start",
+    ),
+    "tasks": (
+        "What are my care tasks?",
+        "Show my tasks",
+        "What do I have to do today?",
+        "What's on my schedule?",
+    ),
+}
+
+# Resource search queries for intents that should come with reading or watching suggestions
+RESOURCE_QUERIES = {
+    "stress": "stress overwhelmed burnout",
+    "medication": "medication medical",
+    "appointment": "appointment medical",
+    "lonely": "lonely support group",
+    "angry": "frustrated angry burnout",
+    "sad": "sad emotions",
+}
+
+
+def _trie_pattern(node):
+    """
+    Render a keyword trie as a regex. Branches are tried before ending the match at a node,
+    so the pattern matches the longest keyword starting at a position, and every node has
+    one branch per character, so matching cost does not grow with the number of keywords.
+    """
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        return "(?:" + body + ")?"
+    return body
+
+
+class IntentMatcher:
+    """
+    Single-pass keyword matcher over an intent table.
+
+    All keywords are compiled into one trie-shaped regex, so a message is scanned once
+    instead of once per keyword. At each position the regex matches the longest keyword
+    starting there; every other keyword starting at the same position is a prefix of it,
+    so the best priority for a position is precomputed per keyword. Scanning resumes one
+    character past each match start so overlapping keywords are not skipped. The matched
+    intent is the highest-priority match overall, which is exactly what the original
+    if/elif chain returned.
+    """
+
+    def __init__(self, intents=INTENTS):
+        self.intents = tuple(intents)
+        priorities = {}
+        for priority, intent in enumerate(self.intents):
+            for keyword in intent.keywords:
+                priorities.setdefault(keyword, priority)
+
+        # Best priority among all keywords that are a prefix of (or equal to) each keyword
+        self._priority = {
+            keyword: min(p for other, p in priorities.items() if keyword.startswith(other))
+            for keyword in priorities
+        }
+
+        trie = {}
+        for keyword in priorities:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = True
+        self._pattern = re.compile(_trie_pattern(trie))
+
+    def match(self, message):
+        """
+        Return the highest-priority intent whose keywords occur in `message`, or None.
+        :param message: Message text; keywords match case-insensitively
+        """
+        message = message.lower()
+        best = None
+        search = self._pattern.search
+        found = search(message)
+        while found is not None:
+            priority = self._priority[found.group()]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+            found = search(message, found.start() + 1)
+        return None if best is None else self.intents[best]
+
+    def match_many(self, messages):
+        """
+        Return the matched intent (or None) of each message.
+        """
+        return [self.match(message) for message in messages]
+
+    def warm_up(self, background=False):
+        pass  # Nothing to load
+
+
+def reply_for(intent, tone):
+    """
+    Return the canned reply for `intent` in `tone`, or the fallback reply if intent is None.
+    """
+    replies = FALLBACK_REPLIES if intent is None else intent.replies
+    return replies.get(tone)
+
+
+DEFAULT_MATCHER = IntentMatcher()
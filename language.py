@@ -0,0 +1,218 @@
+"""
+Language detection and reply localisation.
+
+Detection seeds langdetect once for deterministic results, skips it for text that is
+too short or plain ASCII to classify reliably, and memoises results. Canned replies are
+localised from a catalog precomputed per (tone, intent, language), so serving a
+non-English reply is a dict lookup. Build or refresh the catalog with:
+    python language.py build-catalog
+"""
+import argparse
+import json
+import os
+import threading
+from functools import lru_cache
+
+from intents import FALLBACK_REPLIES, INTENTS
+from telemetry import get_telemetry
+
+# Languages offered in the app, mapped to the codes langdetect returns
+LANGUAGE_CODES = {
+    "English": "en",
+    "Mandarin Chinese": "zh-cn",
+    "Hindi": "hi",
+    "Spanish": "es",
+    "French": "fr",
+    "Standard Arabic": "ar",
+    "Bengali": "bn",
+    "Portuguese": "pt",
+    "Russian": "ru",
+    "Urdu": "ur",
+}
+# Codes that differ between langdetect and the translation service
+TRANSLATOR_CODES = {"zh-cn": "zh-CN", "zh-tw": "zh-TW"}
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reply_translations.json")
+MIN_DETECT_LENGTH = 4
+FALLBACK_INTENT = "fallback"
+
+
+def catalog_key(tone, intent_name):
+    return f"{tone}:{intent_name or FALLBACK_INTENT}"
+
+
+class LanguageService:
+    """
+    Memoised, deterministic wrapper around langdetect.
+    """
+
+    def __init__(self, seed=0, cache_size=4096, min_length=MIN_DETECT_LENGTH):
+        self.seed = seed
+        self.min_length = min_length
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._warm_up_thread = None
+        self._detect_cached = lru_cache(maxsize=cache_size)(self._detect_uncached)
+
+    def warm_up(self, background=False):
+        """
+        Seed langdetect and load its language profiles, which otherwise happens on the
+        first detection.
+        """
+        if background:
+            with self._lock:
+                if self._warm_up_thread is None and not self._ready.is_set():
+                    self._warm_up_thread = threading.Thread(target=self.warm_up, name="langdetect-warm-up", daemon=True)
+                    self._warm_up_thread.start()
+            return
+        with self._lock:
+            if self._ready.is_set():
+                return
+            from langdetect import DetectorFactory
+            from langdetect.detector_factory import init_factory
+
+            DetectorFactory.seed = self.seed
+            init_factory()
+            self._ready.set()
+
+    def detect(self, text, default="en"):
+        """
+        Detect the language of `text`.
+        :param default: Returned for text that is too short or ASCII-only to tell apart,
+                        and when detection fails
+        :return: ISO 639-1 language code as returned by langdetect
+        """
+        text = text.strip()
+        if len(text) < self.min_length or text.isascii():
+            return default
+        return self._detect_cached(text) or default
+
+    def _detect_uncached(self, text):
+        self.warm_up()
+        from langdetect import detect
+        from langdetect.lang_detect_exception import LangDetectException
+
+        try:
+            return detect(text)
+        except LangDetectException:
+            return None
+
+    def cache_info(self):
+        return self._detect_cached.cache_info()
+
+    def collect_metrics(self):
+        """
+        Telemetry collector reporting the detection cache's hit and miss counts.
+        """
+        info = self.cache_info()
+        return [
+            ("caregiver_language_cache_total", {"result": "hit"}, info.hits),
+            ("caregiver_language_cache_total", {"result": "miss"}, info.misses),
+        ]
+
+
+def google_translate(text, language):
+    """
+    Translate English text with deep-translator's Google backend (needs network access).
+    """
+    from deep_translator import GoogleTranslator
+
+    return GoogleTranslator(source="en", target=TRANSLATOR_CODES.get(language, language)).translate(text)
+
+
+class ReplyTranslator:
+    """
+    Localises the canned replies from a precomputed {language: {"tone:intent": text}} catalog.
+    Replies missing from the catalog are served in English; nothing is translated at
+    request time.
+    """
+
+    def __init__(self, catalog_path=CATALOG_PATH):
+        self.catalog_path = catalog_path
+        try:
+            with open(catalog_path, encoding="utf-8") as f:
+                self.catalog = json.load(f)
+        except FileNotFoundError:
+            self.catalog = {}
+        except (OSError, ValueError) as e:
+            print(f"Error loading the reply translation catalog: {e}")
+            self.catalog = {}
+
+    def localize(self, text, tone, intent_name, language):
+        """
+        Return the catalog translation of a canned reply, or `text` itself if there is none.
+        :param text: The English reply
+        :param intent_name: Name of the matched intent, None for the fallback reply
+        """
+        if not language or language == "en":
+            return text
+        return self.catalog.get(language, {}).get(catalog_key(tone, intent_name), text)
+
+
+def canned_replies():
+    """
+    Yield (tone, intent name, English text) for every canned reply.
+    """
+    for intent in INTENTS:
+        for tone, text in intent.replies.items():
+            yield tone, intent.name, text
+    for tone, text in FALLBACK_REPLIES.items():
+        yield tone, None, text
+
+
+def build_catalog(languages=None, translate=google_translate, existing=None):
+    """
+    Translate every canned reply into `languages`.
+    :param translate: Callable (text, language) -> translated text; swap in a stub for tests
+    :param existing: Catalog to extend; entries already present are not translated again
+    """
+    catalog = {language: dict(entries) for language, entries in (existing or {}).items()}
+    for language in languages or [code for code in LANGUAGE_CODES.values() if code != "en"]:
+        entries = catalog.setdefault(language, {})
+        for tone, intent_name, text in canned_replies():
+            key = catalog_key(tone, intent_name)
+            if key not in entries:
+                entries[key] = translate(text, language)
+    return catalog
+
+
+_language_service = None
+_reply_translator = None
+_singletons_lock = threading.Lock()
+
+
+def get_language_service():
+    global _language_service
+    with _singletons_lock:
+        if _language_service is None:
+            _language_service = LanguageService()
+            get_telemetry().add_collector(_language_service.collect_metrics)
+        return _language_service
+
+
+def get_reply_translator():
+    global _reply_translator
+    with _singletons_lock:
+        if _reply_translator is None:
+            _reply_translator = ReplyTranslator()
+        return _reply_translator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the reply translation catalog.")
+    parser.add_argument("command", choices=["build-catalog"])
+    parser.add_argument("--languages", nargs="*", help="language codes to translate into (default: all app languages)")
+    parser.add_argument("--rebuild", action="store_true", help="translate every reply again instead of only missing ones")
+    parser.add_argument("--output", default=CATALOG_PATH)
+    args = parser.parse_args()
+
+    existing = {} if args.rebuild else ReplyTranslator(args.output).catalog
+    catalog = build_catalog(args.languages, existing=existing)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Wrote {sum(map(len, catalog.values()))} translations for {len(catalog)} languages to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Gather single-item requests from many threads into batches for one worker thread.
+
+    A batch is dispatched as soon as it holds `max_batch_size` items, or `max_wait` seconds
+    after its first item arrived, whichever comes first. Each caller gets a Future that
+    resolves to its own item's result.
+    """
+
+    def __init__(self, process_batch, max_batch_size=16, max_wait=0.01, name="micro-batcher"):
+        """
+        :param process_batch: Callable taking a list of items and returning a list of results
+                              in the same order
+        :param max_batch_size: Largest number of items passed to one process_batch call
+        :param max_wait: Longest time in seconds the first item of a batch waits for company
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._requests = queue.SimpleQueue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """
+        Queue one item for the next batch.
+        :return: A Future resolving to the item's result
+        """
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._requests.put((item, future))
+        return future
+
+    def submit_many(self, items):
+        return [self.submit(item) for item in items]
+
+    def close(self):
+        """
+        Stop the worker once the requests already queued have been processed.
+        """
+        self._closed = True
+        self._requests.put(None)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+
+            self._dispatch(batch)
+            if stopping:
+                return
+
+    def _dispatch(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = self.process_batch(items)
+            if len(results) != len(batch):
+                raise RuntimeError(f"process_batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Batches mix requests from different callers; retry the items one at a time so
+            # a single bad item only fails its own request
+            for request in batch:
+                self._dispatch([request])
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
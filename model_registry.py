@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+
+from inference_engines import INFERENCE_ENGINE, load_embedding, load_generation, load_sentiment, resolve_engine
+from micro_batcher import MicroBatcher
+from telemetry import get_telemetry
+
+
+GENERATION_MODEL = os.environ.get("CAREGIVER_GENERATION_MODEL", "gpt2")
+SENTIMENT_MODEL = os.environ.get(
+    "CAREGIVER_SENTIMENT_MODEL", "distilbert/distilbert-base-uncased-finetuned-sst-2-english"
+)
+# Multilingual sentence-encoder used to recognise intents (see intent_classifier.py)
+EMBEDDING_MODEL = os.environ.get(
+    "CAREGIVER_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+)
+
+# Sentiment requests from all sessions are grouped into batches of at most this many
+# messages, waiting at most this many seconds for a batch to fill up.
+SENTIMENT_MAX_BATCH_SIZE = int(os.environ.get("CAREGIVER_SENTIMENT_MAX_BATCH_SIZE", "16"))
+SENTIMENT_MAX_WAIT = float(os.environ.get("CAREGIVER_SENTIMENT_MAX_WAIT_MS", "10")) / 1000
+
+
+def current_rss_bytes():
+    """
+    Return the resident set size of this process in bytes (0 if it cannot be read).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        import sys
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models.
+
+    Each model is loaded at most once per process, no matter how many Streamlit sessions
+    or threads ask for it concurrently. Loaded models are shared read-only: callers must not
+    mutate them, and anything per-session (language, tone, ...) belongs on the chatbot.
+    """
+
+    def __init__(self, device=-1, generation_model=GENERATION_MODEL, sentiment_model=SENTIMENT_MODEL,
+                 engine=INFERENCE_ENGINE, embedding_model=EMBEDDING_MODEL):
+        """
+        :param engine: Inference engine the models run on: "torch", "int8" or "onnx"
+                       (see inference_engines.py)
+        """
+        self.device = device
+        self.engine = resolve_engine(engine, device)
+        self.generation_model = generation_model
+        self.sentiment_model = sentiment_model
+        self.embedding_model = embedding_model
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        # Loads are serialised: transformers' lazy module imports are not thread-safe, and
+        # loading two models at once would only compete for the same CPU anyway.
+        self._load_lock = threading.RLock()
+        self._warm_up_thread = None
+        self._sentiment_batcher = None
+
+    def get(self, key, loader):
+        """
+        Return the model registered under `key`, calling `loader()` to build it on first use.
+        Concurrent callers wait for a single load instead of loading the model twice.
+        :param key: Hashable cache key
+        :param loader: Zero-argument callable returning the loaded object
+        """
+        try:
+            return self._models[key]
+        except KeyError:
+            pass
+
+        with self._load_lock:
+            if key in self._models:
+                return self._models[key]
+            rss_before = current_rss_bytes()
+            started = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - started
+            self._stats[key] = {
+                "load_seconds": load_seconds,
+                "rss_bytes": max(current_rss_bytes() - rss_before, 0),
+            }
+            telemetry = get_telemetry()
+            telemetry.increment("caregiver_model_loads_total", kind=key[0], engine=self.engine)
+            telemetry.observe("caregiver_model_load_seconds", load_seconds, kind=key[0], engine=self.engine)
+            self._models[key] = model
+            return model
+
+    def is_loaded(self, key):
+        return key in self._models
+
+    def stats(self):
+        """
+        Report load time and resident memory growth for every loaded model.
+        :return: dict mapping model key to {"load_seconds": float, "rss_bytes": int}
+        """
+        return {key: dict(value) for key, value in self._stats.items()}
+
+    def generation(self):
+        """
+        Return the shared (model, tokenizer) pair used for text generation.
+        """
+        return self.get(("generation", self.generation_model, self.device, self.engine), self._load_generation)
+
+    def sentiment(self):
+        """
+        Return the shared sentiment-analysis pipeline.
+        """
+        return self.get(("sentiment", self.sentiment_model, self.device, self.engine), self._load_sentiment)
+
+    def embedding(self):
+        """
+        Return the shared (model, tokenizer) pair of the sentence-encoder.
+        """
+        return self.get(("embedding", self.embedding_model, self.device, self.engine), self._load_embedding)
+
+    def sentiment_batcher(self):
+        """
+        Return the shared MicroBatcher that runs sentiment requests from every session
+        through the sentiment pipeline in batches.
+        """
+        if self._sentiment_batcher is None:
+            analyzer = self.sentiment()
+            with self._lock:
+                if self._sentiment_batcher is None:
+                    self._sentiment_batcher = MicroBatcher(
+                        lambda messages: analyzer(messages, batch_size=len(messages), truncation=True),
+                        max_batch_size=SENTIMENT_MAX_BATCH_SIZE,
+                        max_wait=SENTIMENT_MAX_WAIT,
+                        name="sentiment-batcher",
+                    )
+        return self._sentiment_batcher
+
+    def _load_generation(self):
+        return load_generation(self.generation_model, self.engine, self.device)
+
+    def _load_sentiment(self):
+        return load_sentiment(self.sentiment_model, self.engine, self.device)
+
+    def _load_embedding(self):
+        return load_embedding(self.embedding_model, self.engine, self.device)
+
+    def warm_up(self, background=True, generation=False):
+        """
+        Load the models every chatbot needs.
+        :param background: When True, load in a daemon thread and return immediately
+        :param generation: Also load the language model, which only generative chatbots use
+        :return: The warm-up thread when running in the background, otherwise None
+        """
+        if not background:
+            self._warm_up(generation)
+            return None
+
+        with self._lock:
+            if self._warm_up_thread is None:
+                self._warm_up_thread = threading.Thread(
+                    target=self._warm_up, args=(generation,), name="model-registry-warm-up", daemon=True
+                )
+                self._warm_up_thread.start()
+            return self._warm_up_thread
+
+    def _warm_up(self, generation=False):
+        for load in (self.sentiment, self.generation) if generation else (self.sentiment,):
+            try:
+                load()
+            except Exception as e:
+                print(f"Error warming up models: {e}")
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_model_registry(device=-1, engine=INFERENCE_ENGINE):
+    """
+    Return the process-wide registry for `device` and `engine`, creating it on first use.
+    """
+    with _registries_lock:
+        registry = _registries.get((device, engine))
+        if registry is None:
+            registry = _registries[(device, engine)] = ModelRegistry(device=device, engine=engine)
+        return registry
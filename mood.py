@@ -0,0 +1,35 @@
+"""
+Caregiver mood history: the sentiment of every message the caregiver sent, scored once.
+
+The history is an appended list (a session store list) of (chat index, timestamp, label,
+score) entries, one per user message. Scoring resumes after the chat index of the last
+entry, so nothing is rewritten when a message is scored.
+"""
+
+
+def update_mood_history(chatbot, chat_log, mood_log):
+    """
+    Score the user messages added to the chat history since the last call, in one batch.
+    Earlier messages keep their stored scores and the bot's replies are never scored.
+    :param mood_log: List of mood entries with append(), tail() and entries(), e.g. a StoredList
+    """
+    last = mood_log.tail(1)
+    start = last[0][0] + 1 if last else 0
+    new_entries = [(index, entry) for index, entry in enumerate(chat_log.entries(start), start) if entry[0] == "You"]
+    if new_entries:
+        results = chatbot.analyze_sentiments([message for _, (_, message, _) in new_entries])
+        for (index, (_, _, timestamp)), result in zip(new_entries, results):
+            mood_log.append((index, timestamp, result["label"], result["score"]))
+
+
+def get_mood_df(chatbot, chat_log, mood_log):
+    """
+    Return the mood history as a DataFrame indexed by time, with "Mood" and "Score" columns.
+    """
+    import pandas as pd
+
+    update_mood_history(chatbot, chat_log, mood_log)
+    df = pd.DataFrame(list(mood_log.entries()), columns=["Message", "Time", "Mood", "Score"])
+    # Two tabs of the same user may both score a message they saw at the same time
+    df = df.drop_duplicates("Message")
+    return df.drop(columns="Message").set_index("Time")
@@ -0,0 +1,217 @@
+"""
+Search over the caregiver resource catalog (articles and videos).
+
+The catalog in resources.json is loaded once per process into an inverted index mapping
+each token to a posting list of resources and their precomputed BM25 contribution, with
+titles weighing more than tags and tags more than descriptions. Query tokens also match
+index terms they prefix ("burn" finds "burnout") and terms one edit away ("stres" finds
+"stress"), at a reduced weight. A query only visits the posting lists of its terms and
+adds them up with numpy, so it stays in the low milliseconds for catalogs of tens of
+thousands of resources.
+"""
+import bisect
+import json
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+RESOURCES_PATH = os.environ.get(
+    "CAREGIVER_RESOURCES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources.json")
+)
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "description": 1.0}
+PREFIX_WEIGHT = 0.7
+FUZZY_WEIGHT = 0.5
+MAX_EXPANSIONS = 20
+STOPWORDS = frozenset("a an and as at for from how in is it of on or the to with you your".split())
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower().replace("’", "").replace("'", "")) if token not in STOPWORDS]
+
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a, b):
+    """
+    True if `a` and `b` differ by at most one insertion, deletion or substitution.
+    """
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+
+def load_resources(path=RESOURCES_PATH):
+    """
+    Read the resource catalog: a JSON list of {"title", "link", "type", "language", "tags",
+    "description"} objects.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error loading the resource catalog: {e}")
+        return []
+
+
+class ResourceIndex:
+    """
+    Immutable BM25 index over a list of resources; safe to share between threads.
+    """
+
+    def __init__(self, resources, k1=1.2, b=0.75):
+        self.resources = list(resources)
+        self.k1 = k1
+        self.b = b
+        frequencies_by_token = defaultdict(lambda: ([], []))
+        lengths = np.zeros(len(self.resources), dtype=np.float32)
+        languages, types = [], []
+        for doc_id, resource in enumerate(self.resources):
+            languages.append(resource.get("language", "en"))
+            types.append(resource.get("type"))
+            frequencies = defaultdict(float)
+            for field, weight in FIELD_WEIGHTS.items():
+                value = resource.get(field) or ""
+                for token in tokenize(" ".join(value) if isinstance(value, list) else value):
+                    frequencies[token] += weight
+            for token, frequency in frequencies.items():
+                doc_ids, token_frequencies = frequencies_by_token[token]
+                doc_ids.append(doc_id)
+                token_frequencies.append(frequency)
+            lengths[doc_id] = sum(frequencies.values())
+        self._languages = np.array(languages, dtype=object)
+        self._types = np.array(types, dtype=object)
+
+        # Every part of a term's BM25 contribution is fixed at build time, so each posting
+        # stores its final score ("impact") and a query only adds them up
+        norms = k1 * (1 - b + b * lengths / (lengths.mean() if len(lengths) else 1.0))
+        self._postings = {}
+        for token, (doc_ids, token_frequencies) in frequencies_by_token.items():
+            doc_ids = np.array(doc_ids, dtype=np.int32)
+            tf = np.array(token_frequencies, dtype=np.float32)
+            idf = math.log(1 + (len(self.resources) - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            self._postings[token] = (doc_ids, idf * tf * (k1 + 1) / (tf + norms[doc_ids]))
+        self._vocabulary = sorted(self._postings)
+        self._neighbours = None
+        self._neighbours_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.resources)
+
+    def _neighbour_table(self):
+        """
+        Symmetric-delete table for fuzzy lookups, mapping each single-character deletion of a
+        term to the term; built on the first fuzzy lookup.
+        """
+        with self._neighbours_lock:
+            if self._neighbours is None:
+                neighbours = defaultdict(list)
+                for term in self._vocabulary:
+                    if len(term) >= 4:
+                        for variant in _deletes(term):
+                            neighbours[variant].append(term)
+                self._neighbours = neighbours
+            return self._neighbours
+
+    def _expand(self, token):
+        """
+        Return {index term: weight} for the terms a query token matches.
+        """
+        terms = {}
+        if token in self._postings:
+            terms[token] = 1.0
+        if len(token) >= 3:
+            start = bisect.bisect_left(self._vocabulary, token)
+            for term in self._vocabulary[start:start + MAX_EXPANSIONS + 1]:
+                if not term.startswith(token):
+                    break
+                terms.setdefault(term, PREFIX_WEIGHT)
+        if not terms and len(token) >= 4:
+            neighbours = self._neighbour_table()
+            candidates = set(neighbours.get(token, ()))
+            for variant in _deletes(token):
+                if variant in self._postings:
+                    candidates.add(variant)
+                candidates.update(neighbours.get(variant, ()))
+            for term in candidates:
+                if _within_one_edit(token, term):
+                    terms[term] = FUZZY_WEIGHT
+        return terms
+
+    def _scores(self, query):
+        """
+        Return the BM25 score of every resource for the query, 0 for resources it does not match.
+        """
+        scores = np.zeros(len(self.resources), dtype=np.float32)
+        for token in set(tokenize(query)):
+            # A resource counts each query token once, through its best-scoring expansion
+            best = np.zeros(len(self.resources), dtype=np.float32)
+            for term, weight in self._expand(token).items():
+                doc_ids, impacts = self._postings[term]
+                best[doc_ids] = np.maximum(best[doc_ids], weight * impacts)
+            scores += best
+        return scores
+
+    def search(self, query, k=10, offset=0, language=None, resource_type=None):
+        """
+        Rank resources against a free-text query.
+        :param k: Page size
+        :param offset: Number of ranked results to skip, for pagination
+        :param language: Only return resources in this language code
+        :param resource_type: Only return resources of this type ("Article", "Video")
+        :return: (page of resource dicts, each with a "score", total number of matches)
+        """
+        allowed = np.ones(len(self.resources), dtype=bool)
+        if language is not None:
+            allowed &= self._languages == language
+        if resource_type is not None:
+            allowed &= self._types == resource_type
+
+        if not tokenize(query):
+            # No query: the catalog in its own order
+            matches = np.flatnonzero(allowed)
+            return [dict(self.resources[doc_id], score=0.0) for doc_id in matches[offset:offset + k]], len(matches)
+
+        scores = np.where(allowed, self._scores(query), 0.0)
+        total = int(np.count_nonzero(scores))
+        end = min(offset + k, total)
+        if offset >= end:
+            return [], total
+        candidates = np.flatnonzero(scores)
+        if end < len(candidates):
+            # Partial sort: keep the resources scoring at least the `end`-th best score, all of
+            # those tied with it included, so the order below does not depend on the partition
+            cutoff = np.partition(scores[candidates], len(candidates) - end)[len(candidates) - end]
+            candidates = candidates[scores[candidates] >= cutoff]
+        # Best score first, ties broken by catalog order, so pages never repeat or skip resources
+        top = candidates[np.lexsort((candidates, -scores[candidates]))[offset:end]]
+        return [dict(self.resources[doc_id], score=round(float(scores[doc_id]), 4)) for doc_id in top], total
+
+
+_resource_index = None
+_resource_index_lock = threading.Lock()
+
+
+def get_resource_index():
+    """
+    Return the process-wide index over the resource catalog.
+    """
+    global _resource_index
+    with _resource_index_lock:
+        if _resource_index is None:
+            _resource_index = ResourceIndex(load_resources())
+        return _resource_index
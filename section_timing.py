@@ -0,0 +1,91 @@
+"""
+Per-section rerun timing for the Streamlit app.
+
+The app is split into fragments that rerun on their own. Each one records how often and
+for how long it ran, so the report shows exactly which sections an interaction re-executed,
+e.g. that a resource search reruns only the search section and never the chatbot. Every
+run is also observed in the process-wide caregiver_rerun_seconds histogram, and sampled
+runs are profiled (see telemetry.py).
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from telemetry import get_sampling_profiler, get_telemetry
+
+
+class SectionTimer:
+    """
+    Run count and durations of named sections, for one session.
+    """
+
+    def __init__(self):
+        self._sections = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        get_telemetry().observe("caregiver_rerun_seconds", seconds, section=name)
+        with self._lock:
+            stats = self._sections.setdefault(name, {"runs": 0, "last_seconds": 0.0, "total_seconds": 0.0})
+            stats["runs"] += 1
+            stats["last_seconds"] = seconds
+            stats["total_seconds"] += seconds
+
+    def runs(self, name):
+        with self._lock:
+            return self._sections.get(name, {}).get("runs", 0)
+
+    def report(self):
+        """
+        Return one row per section: name, runs, last and mean duration in milliseconds.
+        """
+        with self._lock:
+            return [
+                {
+                    "Section": name,
+                    "Runs": stats["runs"],
+                    "Last (ms)": round(stats["last_seconds"] * 1000, 1),
+                    "Mean (ms)": round(stats["total_seconds"] / stats["runs"] * 1000, 1),
+                }
+                for name, stats in self._sections.items()
+            ]
+
+
+def get_section_timer():
+    """
+    Return the current session's timer.
+    """
+    import streamlit as st
+
+    if "section_timer" not in st.session_state:
+        st.session_state.section_timer = SectionTimer()
+    return st.session_state.section_timer
+
+
+def timed_fragment(name, **fragment_options):
+    """
+    Decorator turning a function into a Streamlit fragment whose every run, full-script or
+    fragment-only, is recorded under `name`.
+    :param fragment_options: Passed on to st.fragment, e.g. run_every
+    """
+    import streamlit as st
+
+    def decorate(func):
+        @st.fragment(**fragment_options)
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            with get_section_timer().section(name), get_sampling_profiler().profile(name):
+                return func(*args, **kwargs)
+
+        return run
+
+    return decorate
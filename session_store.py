@@ -0,0 +1,593 @@
+"""
+Per-user session state kept outside the Streamlit process.
+
+Points, badges, the music toggle, the mood history and the chat history are stored in a
+pluggable backend keyed by user id: Redis for several app replicas behind a load balancer,
+SQLite for a single machine, or memory for tests. Any replica can then serve any user, and
+nothing is lost on restart.
+
+A SessionState reads a key from the backend the first time it is used, so a rerun that
+never touches the chat history never fetches it, and refresh() drops what was read at the
+start of every rerun, so another tab or replica's changes are seen. Changes are kept
+locally and written in one batch by flush(), once per rerun. Only plain values are
+overwritten (last writer wins); counters are incremented and lists appended to in the
+backend itself, so concurrent sessions of one user never lose each other's updates.
+Values are serialised as a format version byte, a compression flag byte and compact JSON,
+zlib-compressed when large.
+"""
+import csv
+import functools
+import io
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import deque
+from datetime import datetime
+
+from config import DATA_DIRECTORY
+
+SESSION_BACKENDS = ("memory", "sqlite", "redis")
+SESSION_BACKEND = os.environ.get("CAREGIVER_SESSION_BACKEND", "sqlite")
+SESSION_DB_PATH = os.environ.get("CAREGIVER_SESSION_DB", os.path.join(DATA_DIRECTORY, "sessions.db"))
+REDIS_URL = os.environ.get("CAREGIVER_REDIS_URL", "redis://localhost:6379/0")
+# Sessions untouched for this long expire from Redis
+SESSION_TTL_SECONDS = int(os.environ.get("CAREGIVER_SESSION_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+
+FORMAT_VERSION = 1
+_RAW, _ZLIB = 0, 1
+COMPRESS_MIN_BYTES = 512
+# Chat entries are read from the backend this many at a time when iterating over them
+ENTRIES_PAGE_SIZE = 500
+_MISSING = object()
+CSV_HEADER = ("Speaker", "Message", "Timestamp")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_values (
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (session_id, key)
+);
+CREATE TABLE IF NOT EXISTS session_counters (
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (session_id, key)
+);
+CREATE TABLE IF NOT EXISTS session_lists (
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (session_id, key, position)
+);
+"""
+
+
+def _encode_special(value):
+    if isinstance(value, datetime):
+        return {"$t": value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__} in the session state")
+
+
+def _decode_special(obj):
+    if len(obj) == 1 and "$t" in obj:
+        return datetime.fromisoformat(obj["$t"])
+    return obj
+
+
+def encode(value):
+    """
+    Serialise a JSON-compatible value (datetimes allowed; tuples come back as lists).
+    """
+    payload = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_encode_special).encode("utf-8")
+    if len(payload) >= COMPRESS_MIN_BYTES:
+        return bytes((FORMAT_VERSION, _ZLIB)) + zlib.compress(payload)
+    return bytes((FORMAT_VERSION, _RAW)) + payload
+
+
+def decode(data):
+    """
+    Deserialise a value written by encode().
+    :raises ValueError: If the data is in an unknown format
+    """
+    if len(data) < 2 or data[0] != FORMAT_VERSION or data[1] not in (_RAW, _ZLIB):
+        raise ValueError(f"Unsupported session state format: {bytes(data[:2])!r}")
+    payload = zlib.decompress(data[2:]) if data[1] == _ZLIB else data[2:]
+    return json.loads(payload, object_hook=_decode_special)
+
+
+
+def iter_csv(entries, rows_per_chunk=500):
+    """
+    Yield (speaker, message, timestamp) entries as UTF-8 CSV, a chunk of rows at a time.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    rows = 0
+    for speaker, message, timestamp in entries:
+        writer.writerow((speaker, message, timestamp.strftime("%Y-%m-%d %H:%M:%S")))
+        rows += 1
+        if rows % rows_per_chunk == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+class MemorySessionBackend:
+    """
+    Session storage in this process's memory, for tests and single-process runs.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._counters = {}
+        self._lists = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id, key):
+        with self._lock:
+            return self._values.get((session_id, key))
+
+    def load_counter(self, session_id, key):
+        with self._lock:
+            return self._counters.get((session_id, key), 0)
+
+    def list_length(self, session_id, key):
+        with self._lock:
+            return len(self._lists.get((session_id, key), ()))
+
+    def list_range(self, session_id, key, start, end):
+        with self._lock:
+            return self._lists.get((session_id, key), [])[start:end]
+
+    def save(self, session_id, values, appends, increments):
+        """
+        Store several values, append to several lists and increment several counters at once.
+        :param values: {key: encoded value}
+        :param appends: {key: [encoded items]}
+        :param increments: {key: amount}
+        """
+        with self._lock:
+            for key, value in values.items():
+                self._values[(session_id, key)] = value
+            for key, amount in increments.items():
+                self._counters[(session_id, key)] = self._counters.get((session_id, key), 0) + amount
+            for key, items in appends.items():
+                self._lists.setdefault((session_id, key), []).extend(items)
+
+
+class SQLiteSessionBackend:
+    """
+    Session storage in SQLite. One connection is shared by all threads behind a lock.
+    """
+
+    def __init__(self, path=SESSION_DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+
+    def load(self, session_id, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM session_values WHERE session_id = ? AND key = ?", (session_id, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def load_counter(self, session_id, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM session_counters WHERE session_id = ? AND key = ?", (session_id, key)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def list_length(self, session_id, key):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM session_lists WHERE session_id = ? AND key = ?", (session_id, key)
+            ).fetchone()[0]
+
+    def list_range(self, session_id, key, start, end):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT value FROM session_lists WHERE session_id = ? AND key = ? AND position >= ? AND position < ? "
+                "ORDER BY position",
+                (session_id, key, start, end),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def save(self, session_id, values, appends, increments):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO session_values (session_id, key, value) VALUES (?, ?, ?)",
+                [(session_id, key, value) for key, value in values.items()],
+            )
+            self._connection.executemany(
+                "INSERT INTO session_counters (session_id, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id, key) DO UPDATE SET value = value + excluded.value",
+                [(session_id, key, amount) for key, amount in increments.items()],
+            )
+            # The position is computed by the insert itself, so other processes appending
+            # to the same list at the same time cannot claim it too
+            self._connection.executemany(
+                "INSERT INTO session_lists (session_id, key, position, value) "
+                "SELECT ?, ?, COALESCE(MAX(position) + 1, 0), ? FROM session_lists WHERE session_id = ? AND key = ?",
+                [(session_id, key, item, session_id, key) for key, items in appends.items() for item in items],
+            )
+
+
+class RedisSessionBackend:
+    """
+    Session storage in Redis (or any server speaking its protocol): one hash of values per
+    session plus one list per appended key. Needs the redis package.
+    """
+
+    def __init__(self, url=REDIS_URL, ttl=SESSION_TTL_SECONDS, prefix="caregiver:session"):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _hash(self, session_id):
+        return f"{self.prefix}:{session_id}"
+
+    def _list(self, session_id, key):
+        return f"{self.prefix}:{session_id}:{key}"
+
+    def _counters(self, session_id):
+        return f"{self.prefix}:{session_id}:counters"
+
+    def load(self, session_id, key):
+        return self._redis.hget(self._hash(session_id), key)
+
+    def load_counter(self, session_id, key):
+        return int(self._redis.hget(self._counters(session_id), key) or 0)
+
+    def list_length(self, session_id, key):
+        return self._redis.llen(self._list(session_id, key))
+
+    def list_range(self, session_id, key, start, end):
+        if start >= end:
+            return []
+        return self._redis.lrange(self._list(session_id, key), start, end - 1)
+
+    def save(self, session_id, values, appends, increments):
+        # One round trip, applied atomically
+        pipeline = self._redis.pipeline(transaction=True)
+        if values:
+            pipeline.hset(self._hash(session_id), mapping=values)
+        pipeline.expire(self._hash(session_id), self.ttl)
+        for key, amount in increments.items():
+            pipeline.hincrby(self._counters(session_id), key, amount)
+        if increments:
+            pipeline.expire(self._counters(session_id), self.ttl)
+        for key, items in appends.items():
+            pipeline.rpush(self._list(session_id, key), *items)
+            pipeline.expire(self._list(session_id, key), self.ttl)
+        pipeline.execute()
+
+
+class StoredList:
+    """
+    List kept in a session backend, appended to but never rewritten. Appends are written by
+    the owning SessionState's flush(); only the latest `window` items are kept in memory.
+    """
+
+    def __init__(self, session, key, window=50):
+        self.session = session
+        self.key = key
+        self._stored = None
+        self._pending = []
+        self._window = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._stored is None:
+            backend, session_id = self.session.backend, self.session.session_id
+            stored = backend.list_length(session_id, self.key)
+            start = max(stored - self._window.maxlen, 0)
+            self._window.extend(self._decode_items(backend.list_range(session_id, self.key, start, stored)))
+            self._window.extend(self._pending)
+            self._stored = stored
+
+    def _decode_items(self, items):
+        return [self._decode_item(decode(item)) for item in items]
+
+    @staticmethod
+    def _decode_item(item):
+        return item
+
+    def refresh(self):
+        """
+        Forget what was read from the backend, so the next access sees items appended
+        elsewhere since. Items not flushed yet are kept.
+        """
+        with self._lock:
+            self._stored = None
+            self._window.clear()
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return self._stored + len(self._pending)
+
+    def append(self, item):
+        with self._lock:
+            self._load()
+            self._pending.append(item)
+            self._window.append(item)
+
+    def tail(self, count):
+        """
+        Return the latest `count` items, oldest first.
+        """
+        with self._lock:
+            self._load()
+            count = min(count, self._stored + len(self._pending))
+            if count <= len(self._window):
+                return list(self._window)[len(self._window) - count:]
+            return self._read_range(self._stored + len(self._pending) - count)
+
+    def entries(self, start=0):
+        """
+        Yield items from index `start` on, reading the backend a page at a time.
+        """
+        with self._lock:
+            self._load()
+            stored, pending = self._stored, list(self._pending)
+        for page_start in range(start, stored, ENTRIES_PAGE_SIZE):
+            page_end = min(page_start + ENTRIES_PAGE_SIZE, stored)
+            yield from self._decode_items(
+                self.session.backend.list_range(self.session.session_id, self.key, page_start, page_end)
+            )
+        yield from pending[max(start - stored, 0):]
+
+    def _read_range(self, start):
+        stored = self._decode_items(
+            self.session.backend.list_range(self.session.session_id, self.key, start, self._stored)
+        ) if start < self._stored else []
+        return stored + self._pending[max(start - self._stored, 0):]
+
+    def pending(self):
+        """
+        Return the items appended since the last flush, encoded for the backend.
+        """
+        with self._lock:
+            return [encode(item) for item in self._pending]
+
+    def saved(self, count):
+        """
+        Record that the first `count` pending items were written to the backend.
+        """
+        with self._lock:
+            del self._pending[:count]
+            if self._stored is not None:
+                self._stored += count
+
+
+class StoredChatLog(StoredList):
+    """
+    Chat history of (speaker, message, timestamp) entries kept in a session backend list.
+    """
+
+    @staticmethod
+    def _decode_item(item):
+        return tuple(item)
+
+    def append(self, speaker, message, timestamp=None):
+        super().append((speaker, message, timestamp or datetime.now()))
+
+    def iter_csv(self, rows_per_chunk=500):
+        """
+        Yield the whole history as UTF-8 CSV, a chunk of rows at a time.
+        """
+        return iter_csv(self.entries(), rows_per_chunk)
+
+
+class SessionState:
+    """
+    Mapping of one user's session values, read lazily from a backend and written back in
+    one batch by flush(), plus counters and appended lists for values several sessions of
+    the same user change at once.
+    """
+
+    def __init__(self, session_id, backend):
+        self.session_id = session_id
+        self.backend = backend
+        # key -> (stored bytes or None, current value)
+        self._loaded = {}
+        self._dirty = set()
+        # key -> value read from the backend; key -> amount not flushed yet
+        self._counters = {}
+        self._increments = {}
+        self._lists = {}
+        self._lock = threading.RLock()
+
+    def _load(self, key):
+        with self._lock:
+            if key not in self._loaded:
+                data = self.backend.load(self.session_id, key)
+                value = _MISSING
+                if data is not None:
+                    try:
+                        value = decode(data)
+                    except ValueError as e:
+                        print(f"Error reading session value {key}: {e}")
+                self._loaded[key] = (data, value)
+            return self._loaded[key][1]
+
+    def __contains__(self, key):
+        return self._load(key) is not _MISSING
+
+    def __getitem__(self, key):
+        value = self._load(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        """
+        Set a value, written back by the next flush(). Assign again after changing a list
+        or dict in place; for values changed concurrently, use counters and lists instead.
+        """
+        with self._lock:
+            self._loaded[key] = (self._loaded.get(key, (None,))[0], value)
+            self._dirty.add(key)
+
+    def get(self, key, default=None):
+        value = self._load(key)
+        return default if value is _MISSING else value
+
+    def counter(self, key):
+        """
+        Return the integer counter stored under `key` (0 if never incremented).
+        """
+        with self._lock:
+            if key not in self._counters:
+                self._counters[key] = self.backend.load_counter(self.session_id, key)
+            return self._counters[key] + self._increments.get(key, 0)
+
+    def increment(self, key, amount=1):
+        """
+        Add `amount` to a counter. The backend adds it to its own value on flush(), so
+        increments made by other sessions in the meantime are kept.
+        :return: The counter's new value
+        """
+        with self._lock:
+            self._increments[key] = self._increments.get(key, 0) + amount
+            return self.counter(key)
+
+    def stored_list(self, key):
+        """
+        Return the appended list stored under `key`.
+        """
+        return self._list(key, StoredList)
+
+    def chat_log(self, key="chat_history"):
+        """
+        Return the chat history stored under `key`.
+        """
+        return self._list(key, StoredChatLog)
+
+    def _list(self, key, cls):
+        with self._lock:
+            if key not in self._lists:
+                self._lists[key] = cls(self, key)
+            return self._lists[key]
+
+    def refresh(self):
+        """
+        Forget the values, counters and list lengths read so far, so they are read again on
+        next use; called at the start of every rerun. Changes not flushed yet are kept.
+        """
+        with self._lock:
+            self._loaded = {key: self._loaded[key] for key in self._dirty}
+            self._counters.clear()
+            for stored_list in self._lists.values():
+                stored_list.refresh()
+
+    def flush(self):
+        """
+        Write every changed value, counter increment and appended item to the backend in
+        one batch.
+        :return: Number of values, counters and items written
+        """
+        with self._lock:
+            values = {}
+            for key in self._dirty:
+                data, value = self._loaded[key]
+                encoded = encode(value)
+                if encoded != data:
+                    values[key] = encoded
+            appends = {key: items for key, stored_list in self._lists.items() if (items := stored_list.pending())}
+            increments = {key: amount for key, amount in self._increments.items() if amount}
+            if not values and not appends and not increments:
+                self._dirty.clear()
+                return 0
+            try:
+                self.backend.save(self.session_id, values, appends, increments)
+            except Exception as e:
+                print(f"Error saving the session state: {e}")
+                return 0
+            for key, encoded in values.items():
+                self._loaded[key] = (encoded, self._loaded[key][1])
+            for key, items in appends.items():
+                self._lists[key].saved(len(items))
+            for key, amount in increments.items():
+                if key in self._counters:
+                    self._counters[key] += amount
+            self._increments.clear()
+            self._dirty.clear()
+            return len(values) + len(increments) + sum(len(items) for items in appends.values())
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_session_backend(name=SESSION_BACKEND):
+    """
+    Return the process-wide session backend called `name`: "memory", "sqlite" or "redis".
+    """
+    if name not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown session backend {name!r}; expected one of: {', '.join(SESSION_BACKENDS)}")
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            backend = _backends[name] = {
+                "memory": MemorySessionBackend,
+                "sqlite": SQLiteSessionBackend,
+                "redis": RedisSessionBackend,
+            }[name]()
+        return backend
+
+
+def get_streamlit_session(user_id):
+    """
+    Return the current Streamlit session's persistent state for `user_id`, refreshed from
+    the backend for this rerun.
+    """
+    import streamlit as st
+
+    session = st.session_state.get("persistent_session")
+    if session is None or session.session_id != user_id:
+        session = st.session_state.persistent_session = SessionState(user_id, get_session_backend())
+    else:
+        session.refresh()
+    return session
+
+
+def sync_session_on_fragment_run(func):
+    """
+    Decorator for fragment bodies that use the persistent session state. When the fragment
+    reruns on its own, the top and the end of the script are not reached, so the state is
+    refreshed before the body runs and flushed after it.
+    """
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        ctx = get_script_run_ctx()
+        session = st.session_state.get("persistent_session")
+        fragment_run = session is not None and ctx is not None and bool(ctx.fragment_ids_this_run)
+        if fragment_run:
+            session.refresh()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if fragment_run:
+                session.flush()
+
+    return run
@@ -0,0 +1,102 @@
+"""
+Cold start of the Streamlit app.
+
+The first page is rendered before torch, transformers or any model is loaded: the app
+starts the process-wide WarmUp once its first page has been sent, and the conversation
+shows a "warming up" notice until the sentiment model, the intent encoder and
+langdetect's profiles are ready. The language model is left to the first generative
+chatbot, since generated replies are opt-in. Check the cold start against a budget with
+    python benchmarks/startup_report.py
+"""
+import os
+import threading
+import time
+
+from inference_engines import INFERENCE_ENGINE, default_device
+from intent_classifier import get_intent_classifier
+from language import get_language_service
+from model_registry import get_model_registry
+
+# Seconds to wait after the first page before loading anything, e.g. to leave the CPU to
+# the first visitors' page loads on a small instance
+WARM_UP_DELAY = float(os.environ.get("CAREGIVER_WARM_UP_DELAY", "0"))
+
+
+class WarmUp:
+    """
+    Loads everything the chatbot needs in a daemon thread, once per process.
+    """
+
+    def __init__(self, engine=INFERENCE_ENGINE, delay=WARM_UP_DELAY):
+        self.engine = engine
+        self.delay = delay
+        self.device = None
+        self.registry = None
+        # What is being loaded right now, for the "warming up" notice
+        self.step = "Waiting for the first page"
+        self._ready = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def start(self):
+        """
+        Start warming up in the background. Calling it again is a no-op.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="startup-warm-up", daemon=True)
+                self._thread.start()
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Block until warming up has finished.
+        :return: True if it has, False on timeout
+        """
+        return self._ready.wait(timeout)
+
+    def _run(self):
+        if self.delay:
+            self.step = "Waiting to start"
+            time.sleep(self.delay)
+        try:
+            self.step = "Checking for a GPU"
+            self.device = default_device()
+        except Exception as e:
+            print(f"Error detecting the device, using CPU: {e}")
+            self.device = -1
+        self.registry = get_model_registry(self.device, self.engine)
+        steps = (
+            ("Loading the sentiment model", self.registry.sentiment),
+            ("Loading the intent encoder", get_intent_classifier(self.registry).warm_up),
+            ("Loading language detection", get_language_service().warm_up),
+        )
+        for step, load in steps:
+            self.step = step
+            try:
+                load()
+            except Exception as e:
+                print(f"Error warming up ({step}): {e}")
+        self.step = "Ready"
+        self._ready.set()
+
+
+_warm_up = None
+_warm_up_lock = threading.Lock()
+
+
+def get_warm_up():
+    """
+    Return the process-wide warm-up.
+    """
+    global _warm_up
+    with _warm_up_lock:
+        if _warm_up is None:
+            _warm_up = WarmUp()
+        return _warm_up
@@ -0,0 +1,434 @@
+"""
+Persistent care-task store and an in-process reminder scheduler.
+
+Tasks are kept in SQLite, keyed by user, with indexes on (user_id, due_at) and on type so
+listing upcoming, due and overdue tasks stays an index range scan even for users with
+thousands of recurring tasks. Due times are stored as ISO-8601 strings
+("YYYY-MM-DDTHH:MM:SS"), which sort chronologically.
+"""
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+from config import DATA_DIRECTORY
+
+TASK_DB_PATH = os.environ.get("CAREGIVER_TASK_DB", os.path.join(DATA_DIRECTORY, "tasks.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    due_at TEXT NOT NULL,
+    repeat_minutes INTEGER,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_user_due ON tasks (user_id, due_at);
+CREATE INDEX IF NOT EXISTS tasks_type ON tasks (type);
+"""
+
+COLUMNS = "id, user_id, type, name, due_at, repeat_minutes, created_at"
+UPDATABLE_FIELDS = ("type", "name", "due_at", "repeat_minutes")
+
+
+def _local(value):
+    """
+    Return a datetime as naive local time, converting it if it carries a UTC offset.
+    """
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def _iso(value):
+    # Due times are compared as text, so they are all stored in one form: naive local time
+    return _local(value).replace(microsecond=0).isoformat() if isinstance(value, datetime) else value
+
+
+def _row_to_task(row):
+    if row is None:
+        return None
+    task = dict(zip(COLUMNS.split(", "), row))
+    due_at = datetime.fromisoformat(task["due_at"])
+    task["date"] = due_at.strftime("%Y-%m-%d")
+    task["time"] = due_at.strftime("%H:%M")
+    return task
+
+
+class TaskStore:
+    """
+    SQLite-backed care tasks. One connection is shared by all threads behind a lock.
+    """
+
+    def __init__(self, path=TASK_DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def _select(self, where, params, order_limit=""):
+        rows = self._query(f"SELECT {COLUMNS} FROM tasks WHERE {where} {order_limit}", params)
+        return [_row_to_task(row) for row in rows]
+
+    def add_task(self, user_id, task_type, name, due_at, repeat_minutes=None):
+        """
+        Add a task and return it.
+        :param due_at: datetime (or ISO string) the task is due
+        :param repeat_minutes: Interval for recurring tasks, None for a one-off task
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO tasks (user_id, type, name, due_at, repeat_minutes, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, task_type, name, _iso(due_at), repeat_minutes, _iso(datetime.now())),
+            )
+            task_id = cursor.lastrowid
+        return self.get_task(user_id, task_id)
+
+    def get_task(self, user_id, task_id):
+        tasks = self._select("user_id = ? AND id = ?", (user_id, task_id))
+        return tasks[0] if tasks else None
+
+    def update_task(self, user_id, task_id, **fields):
+        """
+        Update some of a task's fields and return the updated task, or None if it does not exist.
+        """
+        fields = {name: _iso(value) for name, value in fields.items() if name in UPDATABLE_FIELDS}
+        if fields:
+            assignments = ", ".join(f"{name} = ?" for name in fields)
+            with self._lock, self._connection:
+                self._connection.execute(
+                    f"UPDATE tasks SET {assignments} WHERE user_id = ? AND id = ?",
+                    (*fields.values(), user_id, task_id),
+                )
+        return self.get_task(user_id, task_id)
+
+    def delete_task(self, user_id, task_id):
+        with self._lock, self._connection:
+            cursor = self._connection.execute("DELETE FROM tasks WHERE user_id = ? AND id = ?", (user_id, task_id))
+        return cursor.rowcount > 0
+
+    def list_tasks(self, user_id, limit=100, offset=0):
+        """
+        Return a page of the user's tasks in due order.
+        """
+        return self._select_page("user_id = ?", (user_id,), limit, offset)
+
+    def _select_page(self, where, params, limit, offset=0):
+        return self._select(where, (*params, limit, offset), "ORDER BY due_at, id LIMIT ? OFFSET ?")
+
+    def next_due(self, user_id, n=5, now=None):
+        """
+        Return the user's next `n` tasks due at or after `now`.
+        """
+        return self._select_page("user_id = ? AND due_at >= ?", (user_id, _iso(now or datetime.now())), n)
+
+    def due_between(self, user_id, start, end, limit=1000):
+        """
+        Return the user's tasks due in the window [start, end).
+        """
+        return self._select_page("user_id = ? AND due_at >= ? AND due_at < ?", (user_id, _iso(start), _iso(end)), limit)
+
+    def overdue(self, user_id, now=None, limit=100):
+        """
+        Return the user's tasks whose due time has passed, oldest first.
+        """
+        return self._select_page("user_id = ? AND due_at < ?", (user_id, _iso(now or datetime.now())), limit)
+
+    def count_overdue(self, user_id, now=None):
+        return self._query(
+            "SELECT COUNT(*) FROM tasks WHERE user_id = ? AND due_at < ?", (user_id, _iso(now or datetime.now()))
+        )[0][0]
+
+    def count_tasks(self, user_id):
+        return self._query("SELECT COUNT(*) FROM tasks WHERE user_id = ?", (user_id,))[0][0]
+
+    def advance_recurring(self, user_id, task_id, now=None):
+        """
+        Move a recurring task to its first occurrence after `now`.
+        :return: The updated task, or None if it does not exist or does not repeat
+        """
+        task = self.get_task(user_id, task_id)
+        if task is None or not task["repeat_minutes"]:
+            return None
+        now = now or datetime.now()
+        interval = timedelta(minutes=task["repeat_minutes"])
+        due_at = datetime.fromisoformat(task["due_at"])
+        if due_at <= now:
+            due_at += interval * ((now - due_at) // interval + 1)
+        return self.update_task(user_id, task_id, due_at=due_at)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class ReminderScheduler:
+    """
+    Fires a callback when tasks of watched users fall due.
+
+    Upcoming due times sit in a min-heap, so the worker sleeps until the earliest one
+    instead of polling the table. Each watched user's tasks are loaded one `horizon` window
+    at a time through the (user_id, due_at) index, and the loaded windows are read again
+    every `reload_every`, so tasks added by other processes (the API, other replicas) fire
+    too, at most that late. Edits and deletions are handled lazily: a heap entry whose task
+    no longer exists, or is now due at another time, is dropped when it surfaces. Recurring
+    tasks are advanced to their next occurrence after firing. Users not watched again for
+    `idle_timeout` are unwatched and their entries dropped.
+    """
+
+    def __init__(self, store, on_due, horizon=timedelta(hours=24), reload_every=timedelta(minutes=1),
+                 idle_timeout=timedelta(hours=1), on_unwatch=None):
+        """
+        :param store: TaskStore to read tasks from
+        :param on_due: Callable receiving each task dict when it falls due
+        :param horizon: How far ahead tasks are loaded into the heap per user
+        :param reload_every: How often the loaded windows are read again from the store
+        :param idle_timeout: How long a user stays watched without another watch() call
+        :param on_unwatch: Optional callable receiving the id of every user unwatched
+        """
+        self.store = store
+        self.on_due = on_due
+        self.horizon = horizon
+        self.reload_every = reload_every
+        self.idle_timeout = idle_timeout
+        self.on_unwatch = on_unwatch
+        self._heap = []
+        self._sequence = itertools.count()
+        self._loaded_until = {}
+        self._last_watched = {}
+        # (user_id, task_id, due_at) of the tasks in the heap, and of those fired since the
+        # previous reload, so a reload pushes neither again
+        self._queued = set()
+        self._fired = set()
+        self._reloaded_at = datetime.now()
+        self._condition = threading.Condition()
+        self._stopped = False
+        with self._condition:
+            self._push(self._reloaded_at + reload_every, "reload", None)
+        self._worker = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self._worker.start()
+
+    def watch(self, user_id, now=None):
+        """
+        Start firing reminders for a user's tasks due from `now` on. Watching again only
+        keeps the user from being unwatched as idle.
+        """
+        with self._condition:
+            self._last_watched[user_id] = datetime.now()
+            if user_id in self._loaded_until:
+                return
+            self._loaded_until[user_id] = now or datetime.now()
+        self._load_window(user_id)
+
+    def unwatch(self, user_id):
+        """
+        Stop firing reminders for a user and forget their upcoming tasks.
+        """
+        with self._condition:
+            if user_id not in self._loaded_until:
+                return
+            self._forget({user_id})
+        if self.on_unwatch is not None:
+            self.on_unwatch(user_id)
+
+    def watched(self):
+        with self._condition:
+            return set(self._loaded_until)
+
+    def schedule(self, task):
+        """
+        Register a new or rescheduled task; call after adding or updating it in the store.
+        """
+        due_at = _local(datetime.fromisoformat(task["due_at"]))
+        with self._condition:
+            loaded_until = self._loaded_until.get(task["user_id"])
+            if loaded_until is not None and datetime.now() <= due_at < loaded_until:
+                self._push_task(task)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._worker.join()
+
+    def _push(self, when, kind, user_id, task_id=None, due_at=None):
+        heapq.heappush(self._heap, (_local(when), next(self._sequence), kind, user_id, task_id, due_at))
+        self._condition.notify()
+
+    def _push_task(self, task):
+        key = (task["user_id"], task["id"], task["due_at"])
+        if key not in self._queued and key not in self._fired:
+            self._queued.add(key)
+            self._push(datetime.fromisoformat(task["due_at"]), "task", *key)
+
+    def _forget(self, user_ids):
+        for user_id in user_ids:
+            del self._loaded_until[user_id]
+            self._last_watched.pop(user_id, None)
+        self._heap = [entry for entry in self._heap if entry[3] not in user_ids]
+        heapq.heapify(self._heap)
+        self._queued = {key for key in self._queued if key[0] not in user_ids}
+        self._fired = {key for key in self._fired if key[0] not in user_ids}
+
+    def _load_window(self, user_id):
+        with self._condition:
+            start = self._loaded_until.get(user_id)
+        if start is None:
+            return  # Unwatched meanwhile
+        end = max(start, datetime.now()) + self.horizon
+        tasks = self.store.due_between(user_id, start, end, limit=-1)
+        with self._condition:
+            if user_id not in self._loaded_until:
+                return
+            self._loaded_until[user_id] = end
+            for task in tasks:
+                self._push_task(task)
+            self._push(end, "refill", user_id)
+
+    def _reload(self):
+        """
+        Unwatch idle users, then read every loaded window again from the previous reload on,
+        picking up tasks added or rescheduled by other processes.
+        """
+        now = datetime.now()
+        with self._condition:
+            idle = {user_id for user_id, seen in self._last_watched.items() if now - seen > self.idle_timeout}
+            if idle:
+                self._forget(idle)
+            start, self._reloaded_at = self._reloaded_at, now
+            # Tasks fired before the previous reload can no longer be read again
+            self._fired = {key for key in self._fired if key[2] >= _iso(start)}
+            windows = dict(self._loaded_until)
+            self._push(now + self.reload_every, "reload", None)
+        if self.on_unwatch is not None:
+            for user_id in idle:
+                self.on_unwatch(user_id)
+
+        for user_id, end in windows.items():
+            tasks = self.store.due_between(user_id, start, end, limit=-1)
+            with self._condition:
+                if user_id in self._loaded_until:
+                    for task in tasks:
+                        self._push_task(task)
+
+    def _drop_invalid_entries(self):
+        """
+        Drop the heap entries whose time is not a naive datetime, the only kind the heap
+        can order against the clock.
+        """
+        valid = []
+        for entry in self._heap:
+            if isinstance(entry[0], datetime) and entry[0].tzinfo is None:
+                valid.append(entry)
+            else:
+                print(f"Dropping invalid reminder entry: {entry}")
+                self._queued.discard(entry[3:])
+        self._heap = valid
+        heapq.heapify(self._heap)
+
+    def _run(self):
+        while True:
+            # One bad entry must not stop the reminders of every user in the process
+            try:
+                with self._condition:
+                    while not self._stopped:
+                        if self._heap:
+                            wait = (self._heap[0][0] - datetime.now()).total_seconds()
+                            if wait <= 0:
+                                break
+                            self._condition.wait(wait)
+                        else:
+                            self._condition.wait()
+                    if self._stopped:
+                        return
+                    _, _, kind, user_id, task_id, due_at = heapq.heappop(self._heap)
+                    if kind == "task":
+                        self._queued.discard((user_id, task_id, due_at))
+            except Exception as e:
+                print(f"Error scheduling reminder: {e}")
+                with self._condition:
+                    self._drop_invalid_entries()
+                continue
+
+            try:
+                if kind == "reload":
+                    self._reload()
+                elif kind == "refill":
+                    self._load_window(user_id)
+                else:
+                    self._fire(user_id, task_id, due_at)
+            except Exception as e:
+                print(f"Error firing reminder: {e}")
+
+    def _fire(self, user_id, task_id, due_at):
+        task = self.store.get_task(user_id, task_id)
+        if task is None or task["due_at"] != due_at:
+            return  # Deleted or rescheduled since it was pushed
+        with self._condition:
+            self._fired.add((user_id, task_id, due_at))
+        self.on_due(task)
+        if task["repeat_minutes"]:
+            next_task = self.store.advance_recurring(user_id, task_id)
+            if next_task is not None:
+                self.schedule(next_task)
+
+
+_task_store = None
+_reminder_scheduler = None
+_due_reminders = defaultdict(lambda: deque(maxlen=50))
+_singletons_lock = threading.Lock()
+
+
+def get_task_store():
+    """
+    Return the process-wide task store.
+    """
+    global _task_store
+    with _singletons_lock:
+        if _task_store is None:
+            _task_store = TaskStore()
+        return _task_store
+
+
+def _collect_due_reminder(task):
+    with _singletons_lock:
+        _due_reminders[task["user_id"]].append(task)
+
+
+def _forget_due_reminders(user_id):
+    with _singletons_lock:
+        _due_reminders.pop(user_id, None)
+
+
+def get_reminder_scheduler():
+    """
+    Return the process-wide reminder scheduler. Reminders it fires are kept per user until
+    collected with pop_due_reminders(), or until the user is unwatched.
+    """
+    store = get_task_store()
+    global _reminder_scheduler
+    with _singletons_lock:
+        if _reminder_scheduler is None:
+            _reminder_scheduler = ReminderScheduler(store, _collect_due_reminder, on_unwatch=_forget_due_reminders)
+        return _reminder_scheduler
+
+
+def pop_due_reminders(user_id):
+    """
+    Return and forget the reminders fired for a user since the last call.
+    """
+    with _singletons_lock:
+        reminders = _due_reminders.pop(user_id, None)
+        return list(reminders) if reminders else []
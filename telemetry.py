@@ -0,0 +1,282 @@
+"""
+Lightweight in-process telemetry: counters, histograms, timing spans and an opt-in
+sampling profiler.
+
+Metrics are rendered in the Prometheus text format. The HTTP API serves them at /metrics,
+the Streamlit app at /metrics on the asset server, and either can also flush them to a
+file (CAREGIVER_METRICS_FILE) for node_exporter's textfile collector. Recording a metric
+is a dict lookup and an addition under a lock, cheap next to the work it describes; the
+profiler costs nothing until CAREGIVER_PROFILE_EVERY is set.
+"""
+import bisect
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import DATA_DIRECTORY
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_FILE = os.environ.get("CAREGIVER_METRICS_FILE")
+METRICS_FLUSH_SECONDS = float(os.environ.get("CAREGIVER_METRICS_FLUSH_SECONDS", "15"))
+# Profile one in every N profiled runs (0 disables profiling)
+PROFILE_EVERY = int(os.environ.get("CAREGIVER_PROFILE_EVERY", "0"))
+PROFILE_DIRECTORY = os.environ.get("CAREGIVER_PROFILE_DIR", os.path.join(DATA_DIRECTORY, "profiles"))
+# "cprofile" writes .prof files; "pyinstrument" writes speedscope JSON (needs pyinstrument)
+PROFILER = os.environ.get("CAREGIVER_PROFILER", "cprofile")
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+METRIC_HELP = {
+    "caregiver_span_seconds": "Time spent in an instrumented stage",
+    "caregiver_rerun_seconds": "Streamlit run time of a page section, or of the full script",
+    "caregiver_first_render_seconds": "Run time of a session's first page; cold for the first of the process",
+    "caregiver_intents_total": "Messages answered, by matched intent",
+    "caregiver_intent_classifications_total": "Messages classified, by what decided the intent",
+    "caregiver_model_loads_total": "Models loaded into the registry",
+    "caregiver_model_load_seconds": "Time taken to load a model",
+    "caregiver_sentiment_cache_total": "Sentiment cache lookups, by result",
+    "caregiver_language_cache_total": "Language detection cache lookups, by result",
+    "caregiver_api_request_seconds": "HTTP API request duration, by endpoint",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Telemetry:
+    """
+    Thread-safe registry of counters and histograms, keyed by metric name and labels.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._flush_thread = None
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """
+        Record one observation (e.g. a duration in seconds) in a histogram.
+        """
+        key = (name, _label_key(labels))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        Time the enclosed block into caregiver_span_seconds{span=name}.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("caregiver_span_seconds", time.perf_counter() - started, span=name, **labels)
+
+    def add_collector(self, collect):
+        """
+        Register a callable run at render time, returning (name, labels dict, value) counter
+        samples; for counts kept elsewhere, such as a cache's own hit counter.
+        """
+        with self._lock:
+            self._collectors.append(collect)
+
+    def counters(self):
+        """
+        Return {(name, labels tuple): value} for every counter, collected ones included.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            collectors = list(self._collectors)
+        for collect in collectors:
+            try:
+                for name, labels, value in collect():
+                    counters[(name, _label_key(labels))] = value
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+        return counters
+
+    def render_prometheus(self):
+        """
+        Return every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            histograms = {key: (list(counts), total, count) for key, (counts, total, count) in self._histograms.items()}
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters().items()):
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def flush_to_file(self, path):
+        """
+        Write the metrics to `path` atomically, so a reader never sees a partial file.
+        """
+        staging = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(staging, "w", encoding="utf-8") as f:
+                f.write(self.render_prometheus())
+            os.replace(staging, path)
+        except OSError as e:
+            print(f"Error writing metrics to {path}: {e}")
+
+    def start_file_flush(self, path, interval=METRICS_FLUSH_SECONDS):
+        """
+        Flush the metrics to `path` every `interval` seconds from a daemon thread. Calling it
+        again is a no-op.
+        """
+        with self._lock:
+            if self._flush_thread is not None:
+                return
+
+            def flush_forever():
+                while True:
+                    time.sleep(interval)
+                    self.flush_to_file(path)
+
+            self._flush_thread = threading.Thread(target=flush_forever, name="metrics-flush", daemon=True)
+            self._flush_thread.start()
+
+
+class _ProfileRun:
+    def __init__(self, name, directory, profiler):
+        self.name = name
+        self.directory = directory
+        self.profiler = profiler
+        self.started = datetime.now()
+        if profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            self._profile = Profiler(async_mode="disabled")
+            self._profile.start()
+        else:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self):
+        profile = self._profile
+        if self.profiler == "pyinstrument":
+            profile.stop()
+        else:
+            profile.disable()
+        stem = f"{self.name.replace(' ', '_')}-{self.started:%Y%m%d-%H%M%S-%f}-{os.getpid()}"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if self.profiler == "pyinstrument":
+                from pyinstrument.renderers import SpeedscopeRenderer
+
+                with open(os.path.join(self.directory, f"{stem}.speedscope.json"), "w", encoding="utf-8") as f:
+                    f.write(profile.output(SpeedscopeRenderer()))
+            else:
+                profile.dump_stats(os.path.join(self.directory, f"{stem}.prof"))
+        except (OSError, ImportError) as e:
+            print(f"Error saving the profile of {self.name}: {e}")
+
+
+class SamplingProfiler:
+    """
+    Profiles one in every `every` runs of the code it wraps and saves each profile to
+    `directory`: cProfile .prof files (open with snakeviz, or turn into a flame graph with
+    flameprof) or pyinstrument speedscope JSON (open in https://www.speedscope.app).
+    """
+
+    def __init__(self, every=PROFILE_EVERY, directory=PROFILE_DIRECTORY, profiler=PROFILER):
+        self.every = every
+        self.directory = directory
+        self.profiler = profiler
+        self._runs = 0
+        self._lock = threading.Lock()
+
+    def _sampled(self):
+        if not self.every:
+            return False
+        with self._lock:
+            self._runs += 1
+            return self._runs % self.every == 0
+
+    @contextmanager
+    def profile(self, name):
+        """
+        Profile the enclosed block if this run is sampled.
+        """
+        run = None
+        if self._sampled():
+            try:
+                run = _ProfileRun(name, self.directory, self.profiler)
+            except (ImportError, ValueError, RuntimeError) as e:
+                print(f"Error starting the profiler: {e}")
+        try:
+            yield
+        finally:
+            if run is not None:
+                run.stop()
+
+
+_telemetry = None
+_sampling_profiler = None
+_singletons_lock = threading.Lock()
+
+
+def get_telemetry():
+    """
+    Return the process-wide telemetry registry. When CAREGIVER_METRICS_FILE is set, it is
+    flushed there periodically.
+    """
+    global _telemetry
+    with _singletons_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry()
+            if METRICS_FILE:
+                _telemetry.start_file_flush(METRICS_FILE)
+        return _telemetry
+
+
+def get_sampling_profiler():
+    global _sampling_profiler
+    with _singletons_lock:
+        if _sampling_profiler is None:
+            _sampling_profiler = SamplingProfiler()
+        return _sampling_profiler